@@ -2,26 +2,65 @@
 Alarm Manager - Handles alarm storage, scheduling, and triggering.
 """
 
+import heapq
 import json
 import logging
 import math
+import os
+import secrets
+import sys
 import threading
-import uuid
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+DAY_NAMES = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+SHORT_DAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def _atomic_write_json(path, data):
+    """Write JSON to a temp file and rename it over path, so a crash never leaves a partial file."""
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps(data, separators=(',', ':')))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _intern_keys(obj):
+    """json object_hook that interns field names so later lookups hit the identity fast path."""
+    return {sys.intern(k): v for k, v in obj.items()}
+
+
+def _time_to_minutes(time_str):
+    """Convert an 'HH:MM' string to minutes since midnight."""
+    hours, minutes = time_str.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def _is_valid_time(time_str):
+    """Check that a value is an 'HH:MM' time on the 24-hour clock."""
+    try:
+        hours, minutes = time_str.split(':')
+        return (len(hours) == 2 and len(minutes) == 2
+                and 0 <= int(hours) < 24 and 0 <= int(minutes) < 60)
+    except (AttributeError, ValueError):
+        return False
+
 
 class AlarmManager:
     """Manages alarm storage and scheduling."""
 
     DAYS_MAP = {
-        'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-        'friday': 4, 'saturday': 5, 'sunday': 6,
-        'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6
+        **{name: num for num, name in enumerate(DAY_NAMES)},
+        **{name: num for num, name in enumerate(SHORT_DAY_NAMES)}
     }
 
+    # Journal entries to accumulate before rewriting the full JSON files
+    JOURNAL_COMPACT_THRESHOLD = 50
+
     def __init__(self, rtc, audio_player, display, snooze_minutes=9, timeout_minutes=5):
         self.rtc = rtc
         self.audio_player = audio_player
@@ -29,120 +68,286 @@ class AlarmManager:
         self.snooze_minutes = snooze_minutes
         self.timeout_minutes = timeout_minutes
 
-        self.alarms_file = Path(__file__).parent / 'alarms.json'
-        self.overrides_file = Path(__file__).parent / 'overrides.json'
-        self.alarms = {}
-        self.overrides = {}
-        self._load_alarms()
-        self._load_overrides()
-
         self._running = False
         self._thread = None
+        self._stop_event = threading.Event()
         self._lock = threading.Lock()
+        # Serializes ring/snooze/dismiss transitions; the state itself is read without it.
+        # Taken before self._lock when both are needed (dismiss deletes overrides).
+        self._ring_lock = threading.RLock()
 
         self._ringing = False
         self._ringing_alarm_id = None
         self._ringing_override_id = None
         self._ringing_since = None
         self._snooze_until = None
-        self._triggered_at = {}  # alarm_id -> 'YYYY-MM-DD HH:MM' of last trigger
+        self._triggered_at = {}  # alarm_id -> datetime (minute) of last trigger
+
+        # Min-heap of (trigger_datetime, alarm_id, override_id), one entry per enabled alarm
+        self._schedule = []
+
+        self.alarms_file = Path(__file__).parent / 'alarms.json'
+        self.overrides_file = Path(__file__).parent / 'overrides.json'
+
+        # Alarms and overrides are published as immutable snapshots: writers
+        # copy, modify and swap the dict under the lock, readers just grab it
+        self._alarms_snapshot = {}
+        self._overrides_snapshot = {}
+        self._overrides_by_alarm = {}  # alarm_id -> {target_date: override}
+        self._override_expiry = []  # min-heap of (target_date, override_id)
+        self._cleaned_up_on = None  # date of the last expired-override cleanup
+
+        # Mutations are appended to a journal per file and folded back into
+        # the JSON files by _compact()
+        self._alarms_journal = open(self.alarms_file.with_suffix('.log'), 'a', buffering=1)
+        self._overrides_journal = open(self.overrides_file.with_suffix('.log'), 'a', buffering=1)
+        self._journal_entries = 0
+
+        self._load_alarms()
+        self._load_overrides()
+        self._compact()
+        self._rebuild_schedule()
 
     def _load_alarms(self):
-        """Load alarms from JSON file."""
+        """Load alarms from JSON file and replay the journal on top."""
         if self.alarms_file.exists():
             try:
                 with open(self.alarms_file) as f:
-                    data = json.load(f)
+                    data = json.load(f, object_hook=_intern_keys)
                 if not isinstance(data, dict):
                     raise ValueError(f"Expected dict, got {type(data).__name__}")
-                self.alarms = data
-                logger.info(f"Loaded {len(self.alarms)} alarms")
+                self._alarms_snapshot = data
             except (json.JSONDecodeError, IOError, ValueError) as e:
-                logger.error(f"Failed to load alarms: {e}")
-                self.alarms = {}
+                logger.error("Failed to load alarms: %s", e)
+                self._alarms_snapshot = {}
         else:
-            self.alarms = {}
-            self._save_alarms()
+            self._alarms_snapshot = {}
+
+        self._replay_journal(self.alarms_file.with_suffix('.log'), self._alarms_snapshot)
+        # Drop records whose days can't be read rather than failing the load
+        invalid = []
+        for alarm_id, alarm in self._alarms_snapshot.items():
+            try:
+                alarm['days'] = self._normalize_days(alarm.get('days'))
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                logger.error("Dropping invalid alarm %s: %s", alarm_id, e)
+                invalid.append(alarm_id)
+        for alarm_id in invalid:
+            del self._alarms_snapshot[alarm_id]
+        logger.info("Loaded %s alarms", len(self._alarms_snapshot))
 
     def _save_alarms(self):
-        """Save alarms to JSON file."""
+        """Save alarms to JSON file. Returns True on success."""
         try:
-            with open(self.alarms_file, 'w') as f:
-                json.dump(self.alarms, f, indent=2)
+            _atomic_write_json(self.alarms_file, self._alarms_snapshot)
+            return True
         except IOError as e:
-            logger.error(f"Failed to save alarms: {e}")
+            logger.error("Failed to save alarms: %s", e)
+            return False
 
     def _load_overrides(self):
-        """Load overrides from JSON file."""
+        """Load overrides from JSON file and replay the journal on top."""
         if self.overrides_file.exists():
             try:
                 with open(self.overrides_file) as f:
-                    self.overrides = json.load(f)
-                logger.info(f"Loaded {len(self.overrides)} overrides")
-                self._cleanup_expired_overrides()
-            except (json.JSONDecodeError, IOError) as e:
-                logger.error(f"Failed to load overrides: {e}")
-                self.overrides = {}
+                    data = json.load(f, object_hook=_intern_keys)
+                if not isinstance(data, dict):
+                    raise ValueError(f"Expected dict, got {type(data).__name__}")
+                self._overrides_snapshot = data
+            except (json.JSONDecodeError, IOError, ValueError) as e:
+                logger.error("Failed to load overrides: %s", e)
+                self._overrides_snapshot = {}
         else:
-            self.overrides = {}
-            self._save_overrides()
+            self._overrides_snapshot = {}
+
+        self._replay_journal(self.overrides_file.with_suffix('.log'), self._overrides_snapshot)
+        self._index_overrides()
+        logger.info("Loaded %s overrides", len(self._overrides_snapshot))
+        self._cleanup_expired_overrides()
 
     def _save_overrides(self):
-        """Save overrides to JSON file."""
+        """Save overrides to JSON file. Returns True on success."""
         try:
-            with open(self.overrides_file, 'w') as f:
-                json.dump(self.overrides, f, indent=2)
+            _atomic_write_json(self.overrides_file, self._overrides_snapshot)
+            return True
         except IOError as e:
-            logger.error(f"Failed to save overrides: {e}")
+            logger.error("Failed to save overrides: %s", e)
+            return False
 
-    def _cleanup_expired_overrides(self):
-        """Remove overrides for past dates (not today - those are cleared on trigger/dismiss)."""
-        now = self.rtc.get_time()
-        yesterday = (now - timedelta(days=1)).strftime('%Y-%m-%d')
+    def _replay_journal(self, journal_path, records):
+        """Apply the put/del entries from a journal file to a dict of records."""
+        if not journal_path.exists():
+            return
+
+        try:
+            with open(journal_path) as f:
+                for line in f:
+                    # A partially written last line after a crash, or a
+                    # malformed entry, is skipped rather than aborting the load
+                    try:
+                        entry = json.loads(line, object_hook=_intern_keys)
+                        if entry['op'] == 'put':
+                            if not isinstance(entry['val'], dict):
+                                raise TypeError(f"Expected dict, got {type(entry['val']).__name__}")
+                            records[entry['id']] = entry['val']
+                        else:
+                            records.pop(entry['id'], None)
+                    except (json.JSONDecodeError, KeyError, TypeError) as e:
+                        logger.warning("Ignoring corrupt entry in %s: %s", journal_path.name, e)
+        except IOError as e:
+            logger.error("Failed to replay %s: %s", journal_path.name, e)
+
+    def _append_journal(self, journal, records, record_ids):
+        """Append the current state of records, or their deletion if gone, to a journal."""
+        lines = []
+        for record_id in record_ids:
+            record = records.get(record_id)
+            if record is None:
+                entry = {'op': 'del', 'id': record_id}
+            else:
+                entry = {'op': 'put', 'id': record_id, 'val': record}
+            lines.append(json.dumps(entry, separators=(',', ':')) + '\n')
+
+        # One write (and so one flush) for the whole batch
+        try:
+            journal.write(''.join(lines))
+        except (IOError, ValueError) as e:
+            logger.error("Failed to write journal entry: %s", e)
+            return
+
+        self._journal_entries += len(lines)
+        if self._journal_entries >= self.JOURNAL_COMPACT_THRESHOLD:
+            self._compact()
+
+    def _put_alarm(self, alarm):
+        """Publish a new or changed alarm and journal it. Caller must hold the lock."""
+        alarms = dict(self._alarms_snapshot)
+        alarms[alarm['id']] = alarm
+        self._alarms_snapshot = alarms
+        self._log_alarm(alarm['id'])
+
+    def _remove_alarm(self, alarm_id):
+        """Publish and journal an alarm's removal. Caller must hold the lock."""
+        alarms = dict(self._alarms_snapshot)
+        del alarms[alarm_id]
+        self._alarms_snapshot = alarms
+        self._log_alarm(alarm_id)
+
+    def _index_overrides(self):
+        """Rebuild the per-alarm override index and expiry heap from the overrides snapshot."""
+        index = {}
+        expiry = []
+        invalid = []
+        for override_id, override in self._overrides_snapshot.items():
+            # Drop records that can't be indexed rather than failing the load
+            try:
+                target_date = override['target_date']
+                if not isinstance(target_date, str):
+                    raise TypeError(f"target_date is {type(target_date).__name__}")
+                index.setdefault(override['alarm_id'], {})[target_date] = override
+            except (KeyError, TypeError) as e:
+                logger.error("Dropping invalid override %s: %s", override_id, e)
+                invalid.append(override_id)
+                continue
+            expiry.append((target_date, override_id))
+
+        for override_id in invalid:
+            del self._overrides_snapshot[override_id]
+        self._overrides_by_alarm = index
+
+        heapq.heapify(expiry)
+        self._override_expiry = expiry
+
+    def _put_override(self, override):
+        """Publish a new or changed override and journal it. Caller must hold the lock."""
+        if override['id'] not in self._overrides_snapshot:
+            heapq.heappush(self._override_expiry, (override['target_date'], override['id']))
+
+        overrides = dict(self._overrides_snapshot)
+        overrides[override['id']] = override
+        self._overrides_snapshot = overrides
+
+        alarm_id = override['alarm_id']
+        by_date = dict(self._overrides_by_alarm.get(alarm_id, {}))
+        by_date[override['target_date']] = override
+        self._overrides_by_alarm = {**self._overrides_by_alarm, alarm_id: by_date}
+
+        self._log_override(override['id'])
+
+    def _remove_override(self, override_id):
+        """Publish and journal an override's removal. Caller must hold the lock."""
+        overrides = dict(self._overrides_snapshot)
+        override = overrides.pop(override_id)
+        self._overrides_snapshot = overrides
+
+        alarm_id = override['alarm_id']
+        by_date = dict(self._overrides_by_alarm[alarm_id])
+        del by_date[override['target_date']]
+        index = dict(self._overrides_by_alarm)
+        if by_date:
+            index[alarm_id] = by_date
+        else:
+            del index[alarm_id]
+        self._overrides_by_alarm = index
+
+        self._log_override(override_id)
 
-        expired = []
-        for override_id, override in self.overrides.items():
-            target_date = override.get('target_date', '')
-            if target_date <= yesterday:
-                expired.append(override_id)
+    def _log_alarm(self, *alarm_ids):
+        """Journal changes to alarms. Caller must hold the lock."""
+        self._append_journal(self._alarms_journal, self._alarms_snapshot, alarm_ids)
 
-        for override_id in expired:
-            del self.overrides[override_id]
-            logger.info(f"Cleaned up expired override {override_id}")
+    def _log_override(self, *override_ids):
+        """Journal changes to overrides. Caller must hold the lock."""
+        self._append_journal(self._overrides_journal, self._overrides_snapshot, override_ids)
 
-        if expired:
-            self._save_overrides()
+    def _compact(self):
+        """Rewrite the JSON files from memory and truncate the journals."""
+        # Only drop the journals once both snapshots are safely on disk
+        if self._save_alarms() and self._save_overrides():
+            self._alarms_journal.truncate(0)
+            self._overrides_journal.truncate(0)
+            self._journal_entries = 0
+
+    def _cleanup_expired_overrides(self):
+        """Remove overrides for past dates (not today - those are cleared on trigger/dismiss)."""
+        today = self.rtc.get_time().date()
+        yesterday = date.fromordinal(today.toordinal() - 1).isoformat()
+        self._cleaned_up_on = today
+
+        # Entries for overrides deleted in the meantime are just discarded
+        while self._override_expiry and self._override_expiry[0][0] <= yesterday:
+            target_date, override_id = heapq.heappop(self._override_expiry)
+            override = self._overrides_snapshot.get(override_id)
+            if override and override['target_date'] == target_date:
+                self._remove_override(override_id)
+                logger.info("Cleaned up expired override %s", override_id)
 
     def get_all_overrides(self):
         """Get all overrides as a list."""
-        with self._lock:
-            return list(self.overrides.values())
+        return list(self._overrides_snapshot.values())
 
     def get_override(self, override_id):
         """Get a specific override by ID."""
-        with self._lock:
-            return self.overrides.get(override_id)
+        return self._overrides_snapshot.get(override_id)
 
     def get_override_for_alarm(self, alarm_id, target_date):
         """Get override for a specific alarm and date."""
-        with self._lock:
-            for override in self.overrides.values():
-                if override['alarm_id'] == alarm_id and override['target_date'] == target_date:
-                    return override
-            return None
+        return self._overrides_by_alarm.get(alarm_id, {}).get(target_date)
 
     def create_override(self, alarm_id, target_date, override_time=None, override_sound=None, skip=False):
         """Create a new override for an alarm instance."""
+        if override_time is not None and not _is_valid_time(override_time):
+            return None
+
         with self._lock:
-            if alarm_id not in self.alarms:
+            if alarm_id not in self._alarms_snapshot:
                 return None
 
             # Check if override already exists for this alarm/date
-            for override in self.overrides.values():
-                if override['alarm_id'] == alarm_id and override['target_date'] == target_date:
-                    return None  # Already exists
+            if target_date in self._overrides_by_alarm.get(alarm_id, {}):
+                return None
 
-            override_id = str(uuid.uuid4())[:8]
+            override_id = secrets.token_hex(4)
             override = {
                 'id': override_id,
                 'alarm_id': alarm_id,
@@ -152,18 +357,21 @@ class AlarmManager:
                 'skip': skip
             }
 
-            self.overrides[override_id] = override
-            self._save_overrides()
-            logger.info(f"Created override {override_id} for alarm {alarm_id} on {target_date}")
+            self._put_override(override)
+            self._rebuild_schedule()
+            logger.info("Created override %s for alarm %s on %s", override_id, alarm_id, target_date)
             return override
 
     def update_override(self, override_id, data):
         """Update an existing override."""
+        if data.get('override_time') is not None and not _is_valid_time(data['override_time']):
+            return None
+
         with self._lock:
-            if override_id not in self.overrides:
+            if override_id not in self._overrides_snapshot:
                 return None
 
-            override = self.overrides[override_id]
+            override = dict(self._overrides_snapshot[override_id])
 
             if 'override_time' in data:
                 override['override_time'] = data['override_time']
@@ -172,48 +380,54 @@ class AlarmManager:
             if 'skip' in data:
                 override['skip'] = data['skip']
 
-            self._save_overrides()
-            logger.info(f"Updated override {override_id}")
+            self._put_override(override)
+            self._rebuild_schedule()
+            logger.info("Updated override %s", override_id)
             return override
 
     def delete_override(self, override_id):
         """Delete an override (restore original)."""
         with self._lock:
-            if override_id not in self.overrides:
+            if override_id not in self._overrides_snapshot:
                 return False
 
-            del self.overrides[override_id]
-            self._save_overrides()
-            logger.info(f"Deleted override {override_id}")
+            self._remove_override(override_id)
+            self._rebuild_schedule()
+            logger.info("Deleted override %s", override_id)
             return True
 
     def _delete_overrides_for_alarm(self, alarm_id):
         """Delete all overrides for a specific alarm."""
-        to_delete = [oid for oid, o in self.overrides.items() if o['alarm_id'] == alarm_id]
-        for override_id in to_delete:
-            del self.overrides[override_id]
+        to_delete = [o['id'] for o in self._overrides_by_alarm.get(alarm_id, {}).values()]
         if to_delete:
-            self._save_overrides()
-            logger.info(f"Deleted {len(to_delete)} overrides for alarm {alarm_id}")
+            overrides = dict(self._overrides_snapshot)
+            for override_id in to_delete:
+                del overrides[override_id]
+            self._overrides_snapshot = overrides
+
+            index = dict(self._overrides_by_alarm)
+            del index[alarm_id]
+            self._overrides_by_alarm = index
+
+            self._log_override(*to_delete)
+            logger.info("Deleted %s overrides for alarm %s", len(to_delete), alarm_id)
 
     def get_all_alarms(self):
         """Get all alarms as a list."""
-        with self._lock:
-            return list(self.alarms.values())
+        return list(self._alarms_snapshot.values())
 
     def get_alarm(self, alarm_id):
         """Get a specific alarm by ID."""
-        with self._lock:
-            return self.alarms.get(alarm_id)
+        return self._alarms_snapshot.get(alarm_id)
 
     def create_alarm(self, time, days, sound='default.mp3', enabled=True, label='', one_time=False):
         """Create a new alarm."""
-        alarm_id = str(uuid.uuid4())[:8]
+        if not _is_valid_time(time):
+            return None
 
-        # Normalize days to lowercase list
-        if isinstance(days, str):
-            days = [days]
-        days = [d.lower() for d in days]
+        alarm_id = secrets.token_hex(4)
+
+        days = self._normalize_days(days)
 
         alarm = {
             'id': alarm_id,
@@ -226,27 +440,27 @@ class AlarmManager:
         }
 
         with self._lock:
-            self.alarms[alarm_id] = alarm
-            self._save_alarms()
+            self._put_alarm(alarm)
+            self._rebuild_schedule()
 
-        logger.info(f"Created alarm {alarm_id}: {time} on {days}")
+        logger.info("Created alarm %s: %s on %s", alarm_id, time, days)
         return alarm
 
     def update_alarm(self, alarm_id, data):
         """Update an existing alarm."""
+        if 'time' in data and not _is_valid_time(data['time']):
+            return None
+
         with self._lock:
-            if alarm_id not in self.alarms:
+            if alarm_id not in self._alarms_snapshot:
                 return None
 
-            alarm = self.alarms[alarm_id]
+            alarm = dict(self._alarms_snapshot[alarm_id])
 
             if 'time' in data:
                 alarm['time'] = data['time']
             if 'days' in data:
-                days = data['days']
-                if isinstance(days, str):
-                    days = [days]
-                alarm['days'] = [d.lower() for d in days]
+                alarm['days'] = self._normalize_days(data['days'])
             if 'sound' in data:
                 alarm['sound'] = data['sound']
             if 'enabled' in data:
@@ -256,44 +470,44 @@ class AlarmManager:
             if 'one_time' in data:
                 alarm['one_time'] = data['one_time']
 
-            self._save_alarms()
-            logger.info(f"Updated alarm {alarm_id}")
+            self._put_alarm(alarm)
+            self._rebuild_schedule()
+            logger.info("Updated alarm %s", alarm_id)
             return alarm
 
     def delete_alarm(self, alarm_id):
         """Delete an alarm."""
         with self._lock:
-            if alarm_id not in self.alarms:
+            if alarm_id not in self._alarms_snapshot:
                 return False
 
-            del self.alarms[alarm_id]
-            self._save_alarms()
+            self._remove_alarm(alarm_id)
             self._delete_overrides_for_alarm(alarm_id)
-            logger.info(f"Deleted alarm {alarm_id}")
+            self._rebuild_schedule()
+            logger.info("Deleted alarm %s", alarm_id)
             return True
 
     def toggle_alarm(self, alarm_id):
         """Toggle an alarm's enabled state."""
         with self._lock:
-            if alarm_id not in self.alarms:
+            if alarm_id not in self._alarms_snapshot:
                 return None
 
-            alarm = self.alarms[alarm_id]
+            alarm = dict(self._alarms_snapshot[alarm_id])
             alarm['enabled'] = not alarm['enabled']
 
             # When re-enabling a one-time alarm, update the day to the next valid occurrence
             if alarm['enabled'] and alarm.get('one_time'):
                 now = self.rtc.get_time()
-                short_day_names = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
-                alarm_h, alarm_m = map(int, alarm['time'].split(':'))
-                if alarm_h * 60 + alarm_m <= now.hour * 60 + now.minute:
+                if _time_to_minutes(alarm['time']) <= now.hour * 60 + now.minute:
                     day_index = (now.weekday() + 1) % 7  # tomorrow
                 else:
                     day_index = now.weekday()  # still today
-                alarm['days'] = [short_day_names[day_index]]
+                alarm['days'] = [SHORT_DAY_NAMES[day_index]]
 
-            self._save_alarms()
-            logger.info(f"Toggled alarm {alarm_id} to {alarm['enabled']}")
+            self._put_alarm(alarm)
+            self._rebuild_schedule()
+            logger.info("Toggled alarm %s to %s", alarm_id, alarm['enabled'])
             return alarm
 
     def is_ringing(self):
@@ -306,168 +520,225 @@ class AlarmManager:
 
     def snooze(self):
         """Snooze the currently ringing alarm."""
-        if not self._ringing:
-            return
+        with self._ring_lock:
+            if not self._ringing:
+                return
 
-        self._snooze_until = self.rtc.get_time() + timedelta(minutes=self.snooze_minutes)
-        self._ringing = False
-        self.audio_player.stop()
-        self.display.set_alarm_indicator(False)
-        logger.info(f"Alarm snoozed until {self._snooze_until.strftime('%H:%M')}")
+            self._snooze_until = self.rtc.get_time() + timedelta(minutes=self.snooze_minutes)
+            self._ringing = False
+            self.audio_player.stop()
+            self.display.set_alarm_indicator(False)
+            logger.info("Alarm snoozed until %02d:%02d", self._snooze_until.hour, self._snooze_until.minute)
 
     def dismiss(self):
         """Dismiss the currently ringing or snoozed alarm."""
-        if not self._ringing and not self._snooze_until:
-            return
+        with self._ring_lock:
+            if not self._ringing and not self._snooze_until:
+                return
 
-        alarm_id = self._ringing_alarm_id
+            alarm_id = self._ringing_alarm_id
+
+            # Clear the override that was used for this alarm instance
+            if self._ringing_override_id:
+                self.delete_override(self._ringing_override_id)
+
+            self._ringing = False
+            self._ringing_alarm_id = None
+            self._ringing_override_id = None
+            self._ringing_since = None
+            self._snooze_until = None
+            self.audio_player.stop()
+            self.display.set_alarm_indicator(False)
+            logger.info("Alarm dismissed")
+
+            # Disable one-time alarms after they fire
+            if alarm_id:
+                with self._lock:
+                    alarm = self._alarms_snapshot.get(alarm_id)
+                    if alarm and alarm.get('one_time'):
+                        self._put_alarm({**alarm, 'enabled': False})
+                        self._rebuild_schedule()
+                        logger.info("One-time alarm %s disabled after firing", alarm_id)
+
+    @staticmethod
+    def _normalize_days(days):
+        """Normalize days to a lowercase list (a single day may be given as a string)."""
+        if isinstance(days, str):
+            days = [days]
+        return [sys.intern(d.lower()) for d in days]
+
+    @classmethod
+    def _days_to_mask(cls, days):
+        """Convert a list of normalized day names to a bitmask (bit 0 = Monday ... bit 6 = Sunday)."""
+        mask = 0
+        for day_name in days:
+            day_num = cls.DAYS_MAP.get(day_name)
+            if day_num is not None:
+                mask |= 1 << day_num
+        return mask
+
+    def _next_trigger(self, alarm, after):
+        """Get (trigger_datetime, override_id) of an alarm's next instance at or after a minute."""
+        day_mask = self._days_to_mask(alarm['days'])
+        if not day_mask:
+            return None
 
-        # Clear the override that was used for this alarm instance
-        if self._ringing_override_id:
-            self.delete_override(self._ringing_override_id)
+        alarm_minutes = _time_to_minutes(alarm['time'])
+        after_minutes = after.hour * 60 + after.minute
+        after_weekday = after.weekday()
+        after_ordinal = after.toordinal()
+        midnight = after.replace(hour=0, minute=0)
+        overrides = self._overrides_by_alarm.get(alarm['id'])
+
+        # Walk forward day by day; trigger times only grow with the day, so the
+        # first instance that hasn't passed and isn't skipped is the answer.
+        # Each skipped instance uses up an override, which bounds the walk.
+        for days_until in range(7 * (len(overrides or ()) + 2)):
+            if not (day_mask >> ((after_weekday + days_until) % 7)) & 1:
+                continue
+
+            # Check for override (only build the date key if the alarm has any)
+            override = None
+            if overrides:
+                target_date = date.fromordinal(after_ordinal + days_until).isoformat()
+                override = overrides.get(target_date)
+
+            # Skip if override has skip flag
+            if override and override.get('skip'):
+                continue
+
+            # Get effective time (from override or original)
+            if override and override.get('override_time'):
+                minutes = _time_to_minutes(override['override_time'])
+            else:
+                minutes = alarm_minutes
+            if days_until == 0 and minutes < after_minutes:
+                continue
+
+            trigger = midnight + timedelta(days=days_until, minutes=minutes)
+            return trigger, override['id'] if override else None
+
+        return None
+
+    def _schedule_alarm(self, alarm_id, after):
+        """Push an alarm's next instance onto the schedule. Caller must hold the lock."""
+        alarm = self._alarms_snapshot.get(alarm_id)
+        if not alarm or not alarm.get('enabled'):
+            return
 
-        self._ringing = False
-        self._ringing_alarm_id = None
-        self._ringing_override_id = None
-        self._ringing_since = None
-        self._snooze_until = None
-        self.audio_player.stop()
-        self.display.set_alarm_indicator(False)
-        logger.info("Alarm dismissed")
-
-        # Disable one-time alarms after they fire
-        if alarm_id:
-            with self._lock:
-                alarm = self.alarms.get(alarm_id)
-                if alarm and alarm.get('one_time'):
-                    alarm['enabled'] = False
-                    self._save_alarms()
-                    logger.info(f"One-time alarm {alarm_id} disabled after firing")
+        # A record that can't be parsed (e.g. hand-edited alarms.json) is left
+        # unscheduled rather than blocking every other alarm
+        try:
+            entry = self._next_trigger(alarm, after)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.error("Not scheduling alarm %s, invalid data: %s", alarm_id, e)
+            return
+        if entry:
+            heapq.heappush(self._schedule, (entry[0], alarm_id, entry[1]))
+
+    def _rebuild_schedule(self):
+        """Recompute the trigger schedule from scratch. Caller must hold the lock."""
+        minute = self.rtc.get_time().replace(second=0, microsecond=0)
+        self._schedule = []
+        for alarm_id in self._alarms_snapshot:
+            # Don't reschedule an instance that already fired this minute
+            if self._triggered_at.get(alarm_id) == minute:
+                self._schedule_alarm(alarm_id, minute + timedelta(minutes=1))
+            else:
+                self._schedule_alarm(alarm_id, minute)
+
+    def _drop_missed(self, minute):
+        """Reschedule entries whose minute has passed without firing. Caller must hold the lock."""
+        while self._schedule and self._schedule[0][0] < minute:
+            trigger, alarm_id, _ = heapq.heappop(self._schedule)
+            self._schedule_alarm(alarm_id, max(minute, trigger + timedelta(minutes=1)))
 
     def get_next_alarm_info(self):
         """Get information about the next upcoming alarm."""
         now = self.rtc.get_time()
-        current_day = now.weekday()
-        current_time = now.strftime('%H:%M')
-
-        next_alarm = None
-        min_minutes = float('inf')
+        minute = now.replace(second=0, microsecond=0)
 
         # Capture snooze state (not lock-protected, safe to read outside lock)
         snooze_until = self._snooze_until
         snooze_alarm_id = self._ringing_alarm_id
 
+        # If snoozed, treat the snoozed alarm as the next upcoming alarm
+        if snooze_until and snooze_alarm_id:
+            snooze_minutes = (snooze_until - now).total_seconds() / 60
+            if snooze_minutes > 0:
+                alarm = self._alarms_snapshot.get(snooze_alarm_id)
+                if alarm:
+                    return {
+                        'id': alarm['id'],
+                        'time': snooze_until.strftime('%H:%M'),
+                        'original_time': alarm['time'],
+                        'day': SHORT_DAY_NAMES[now.weekday()],
+                        'label': alarm['label'],
+                        'sound': alarm['sound'],
+                        'minutes_until': math.ceil(snooze_minutes),
+                        'target_date': now.date().isoformat(),
+                        'has_override': False,
+                        'override_id': None,
+                        'is_snooze': True
+                    }
+
+        # Only the schedule needs the lock; take the snapshots that match it
+        # along with the entry and build the result outside
         with self._lock:
-            # If snoozed, treat the snoozed alarm as the next upcoming alarm
-            if snooze_until and snooze_alarm_id:
-                snooze_minutes = (snooze_until - now).total_seconds() / 60
-                if snooze_minutes > 0:
-                    alarm = self.alarms.get(snooze_alarm_id)
-                    if alarm:
-                        short_day_names = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
-                        min_minutes = snooze_minutes
-                        next_alarm = {
-                            'id': alarm['id'],
-                            'time': snooze_until.strftime('%H:%M'),
-                            'original_time': alarm['time'],
-                            'day': short_day_names[now.weekday()],
-                            'label': alarm['label'],
-                            'sound': alarm['sound'],
-                            'minutes_until': math.ceil(snooze_minutes),
-                            'target_date': now.strftime('%Y-%m-%d'),
-                            'has_override': False,
-                            'override_id': None,
-                            'is_snooze': True
-                        }
-
-            for alarm in self.alarms.values():
-                if not alarm['enabled']:
-                    continue
-                if snooze_until and alarm['id'] == snooze_alarm_id:
-                    continue  # already handled by snooze block above
-
-                for day_name in alarm['days']:
-                    day_num = self.DAYS_MAP.get(day_name)
-                    if day_num is None:
-                        continue
-
-                    # Calculate days until this alarm
-                    days_until = (day_num - current_day) % 7
-
-                    # Calculate target date for this instance
-                    target_datetime = now + timedelta(days=days_until)
-                    target_date = target_datetime.strftime('%Y-%m-%d')
-
-                    # Check for override
-                    override = None
-                    for o in self.overrides.values():
-                        if o['alarm_id'] == alarm['id'] and o['target_date'] == target_date:
-                            override = o
-                            break
-
-                    # Get effective time (from override or original)
-                    effective_time = override['override_time'] if override and override.get('override_time') else alarm['time']
-
-                    # If it's today, check if the effective time has passed
-                    if days_until == 0 and effective_time < current_time:
-                        days_until = 7
-                        # Recalculate target date for next week
-                        target_datetime = now + timedelta(days=days_until)
-                        target_date = target_datetime.strftime('%Y-%m-%d')
-                        # Re-check for override on the new date
-                        override = None
-                        for o in self.overrides.values():
-                            if o['alarm_id'] == alarm['id'] and o['target_date'] == target_date:
-                                override = o
-                                break
-                        effective_time = override['override_time'] if override and override.get('override_time') else alarm['time']
-
-                    # Skip if override has skip flag
-                    if override and override.get('skip'):
-                        continue
-
-                    # Calculate total minutes until alarm
-                    alarm_hour, alarm_minute = map(int, effective_time.split(':'))
-                    minutes_until = days_until * 24 * 60 + alarm_hour * 60 + alarm_minute
-                    minutes_until -= now.hour * 60 + now.minute
-
-                    if minutes_until < min_minutes:
-                        min_minutes = minutes_until
-                        next_alarm = {
-                            'id': alarm['id'],
-                            'time': effective_time,
-                            'original_time': alarm['time'],
-                            'day': day_name,
-                            'label': alarm['label'],
-                            'sound': override['override_sound'] if override and override.get('override_sound') else alarm['sound'],
-                            'minutes_until': minutes_until,
-                            'target_date': target_date,
-                            'has_override': override is not None,
-                            'override_id': override['id'] if override else None
-                        }
-
-        return next_alarm
+            self._drop_missed(minute)
+            if not self._schedule:
+                return None
+
+            # The head of the heap is the next alarm, unless it belongs to the
+            # snoozed alarm - then the next one is one of the head's children
+            entry = self._schedule[0]
+            if snooze_until and entry[1] == snooze_alarm_id:
+                children = self._schedule[1:3]
+                if not children:
+                    return None
+                entry = min(children)
+
+            alarms = self._alarms_snapshot
+            overrides = self._overrides_snapshot
+
+        trigger, alarm_id, override_id = entry
+        alarm = alarms[alarm_id]
+        override = overrides.get(override_id) if override_id else None
+
+        return {
+            'id': alarm['id'],
+            'time': trigger.strftime('%H:%M'),
+            'original_time': alarm['time'],
+            'day': SHORT_DAY_NAMES[trigger.weekday()],
+            'label': alarm['label'],
+            'sound': override['override_sound'] if override and override.get('override_sound') else alarm['sound'],
+            'minutes_until': int((trigger - minute).total_seconds()) // 60,
+            'target_date': trigger.date().isoformat(),
+            'has_override': override is not None,
+            'override_id': override_id
+        }
 
     def _check_alarms(self):
         """Check if any alarm should be triggered."""
         now = self.rtc.get_time()
-        current_day = now.weekday()
-        current_time = now.strftime('%H:%M')
-        today = now.strftime('%Y-%m-%d')
+        minute = now.replace(second=0, microsecond=0)
 
         # Check if we're in snooze period
         if self._snooze_until:
             if now >= self._snooze_until:
-                # Snooze period ended, ring again
-                self._snooze_until = None
-                self._trigger_alarm(self._ringing_alarm_id, self._ringing_override_id)
+                with self._ring_lock:
+                    # Re-check: a dismiss may have won the race for the lock
+                    if self._snooze_until:
+                        # Snooze period ended, ring again
+                        self._snooze_until = None
+                        self._trigger_alarm(self._ringing_alarm_id, self._ringing_override_id)
             return
 
         # Auto-dismiss if alarm has been ringing too long
         if self._ringing and self._ringing_since:
             elapsed = (now - self._ringing_since).total_seconds() / 60
             if elapsed >= self.timeout_minutes:
-                logger.info(f"Alarm timed out after {self.timeout_minutes} minutes, auto-dismissing")
+                logger.info("Alarm timed out after %s minutes, auto-dismissing", self.timeout_minutes)
                 self.dismiss()
                 return
 
@@ -475,55 +746,27 @@ class AlarmManager:
         if self._ringing:
             return
 
+        # Only pick the due alarm under the lock; triggering it (audio, display)
+        # happens outside so mutators aren't held up. Alarms whose minute
+        # passed while another one was ringing are not triggered late.
         alarm_to_trigger = None
         with self._lock:
-            for alarm_id, alarm in self.alarms.items():
-                if not alarm['enabled']:
-                    continue
-
-                # Check if current day matches alarm days
-                day_names = ['monday', 'tuesday', 'wednesday', 'thursday',
-                           'friday', 'saturday', 'sunday']
-                current_day_name = day_names[current_day]
-
-                alarm_days = [d.lower() for d in alarm['days']]
-                # Also check short day names
-                short_day_names = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
-                current_short_day = short_day_names[current_day]
-
-                if current_day_name not in alarm_days and current_short_day not in alarm_days:
-                    continue
-
-                # Check for override on today's date
-                override = None
-                for o in self.overrides.values():
-                    if o['alarm_id'] == alarm_id and o['target_date'] == today:
-                        override = o
-                        break
-
-                # Skip if override has skip flag
-                if override and override.get('skip'):
-                    continue
-
-                # Get effective time (from override or original)
-                effective_time = override['override_time'] if override and override.get('override_time') else alarm['time']
-
-                # Check if current time matches effective alarm time
-                if effective_time == current_time:
-                    now_minute = f"{today} {current_time}"
-                    if self._triggered_at.get(alarm_id) != now_minute:
-                        alarm_to_trigger = (alarm_id, override['id'] if override else None)
-                        self._triggered_at[alarm_id] = now_minute
-                    break
+            if self._cleaned_up_on != now.date():
+                self._cleanup_expired_overrides()
+            self._drop_missed(minute)
+            if self._schedule and self._schedule[0][0] <= now:
+                _, alarm_id, override_id = heapq.heappop(self._schedule)
+                alarm_to_trigger = (alarm_id, override_id)
+                self._triggered_at[alarm_id] = minute
+                self._schedule_alarm(alarm_id, minute + timedelta(minutes=1))
 
         if alarm_to_trigger:
             self._trigger_alarm(*alarm_to_trigger)
 
     def _trigger_alarm(self, alarm_id, override_id=None):
         """Trigger an alarm."""
-        with self._lock:
-            alarm = self.alarms.get(alarm_id)
-            override = self.overrides.get(override_id) if override_id else None
+        alarm = self._alarms_snapshot.get(alarm_id)
+        override = self._overrides_snapshot.get(override_id) if override_id else None
 
         if not alarm:
             return
@@ -531,13 +774,14 @@ class AlarmManager:
         # Get effective sound (from override or original)
         sound = override['override_sound'] if override and override.get('override_sound') else alarm['sound']
 
-        logger.info(f"Triggering alarm {alarm_id}: {alarm['label'] or alarm['time']}")
-        self._ringing = True
-        self._ringing_alarm_id = alarm_id
-        self._ringing_override_id = override_id
-        self._ringing_since = self.rtc.get_time()
-        self.display.set_alarm_indicator(True)
-        self.audio_player.play(sound, loop=True)
+        logger.info("Triggering alarm %s: %s", alarm_id, alarm['label'] or alarm['time'])
+        with self._ring_lock:
+            self._ringing = True
+            self._ringing_alarm_id = alarm_id
+            self._ringing_override_id = override_id
+            self._ringing_since = self.rtc.get_time()
+            self.display.set_alarm_indicator(True)
+            self.audio_player.play(sound, loop=True)
 
     def _run(self):
         """Background thread that checks alarms."""
@@ -547,9 +791,10 @@ class AlarmManager:
             try:
                 self._check_alarms()
             except Exception as e:
-                logger.error(f"Error checking alarms: {e}")
+                logger.error("Error checking alarms: %s", e)
 
-            threading.Event().wait(1)
+            if self._stop_event.wait(1):
+                break
 
         logger.info("Alarm manager thread stopped")
 
@@ -559,12 +804,17 @@ class AlarmManager:
             return
 
         self._running = True
+        self._stop_event.clear()
         self._thread = threading.Thread(target=self._run, daemon=True)
         self._thread.start()
 
     def stop(self):
         """Stop the alarm manager."""
         self._running = False
+        self._stop_event.set()
         if self._thread:
             self._thread.join(timeout=5)
         self.dismiss()
+
+        with self._lock:
+            self._compact()
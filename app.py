@@ -4,6 +4,7 @@ Raspberry Pi Alarm Clock - Main Application
 Flask server with REST API, alarm scheduling, and hardware control.
 """
 
+import functools
 import json
 import logging
 import os
@@ -13,8 +14,17 @@ import threading
 import time
 from datetime import datetime
 from pathlib import Path
+from typing import Annotated, Optional, Union
 
+import msgspec
 from flask import Flask, jsonify, request, send_from_directory
+from flask.json.provider import JSONProvider
+from flask_caching import Cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from alarm_manager import AlarmManager
 from audio import AudioPlayer
@@ -29,8 +39,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response without a decode/encode round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
+
+
 # Flask app
 app = Flask(__name__, static_folder='static')
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+
+# Short-lived response cache for /api/status; mutating routes delete it
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
 
 # Global instances
 alarm_manager = None
@@ -39,10 +70,19 @@ rtc = None
 audio_player = None
 button_handler = None
 
+# Set once init_hardware() has created the globals above; API routes return 503 until then
+_ready = threading.Event()
+_init_error = None  # Set if background hardware initialization failed
+
+# Parsed config.json, loaded once at startup and written through on settings updates
+CONFIG_PATH = Path(__file__).parent / 'config.json'
+APP_CONFIG = {}
+_config_lock = threading.Lock()
+
 
 def load_config():
     """Load configuration from config.json or use defaults."""
-    config_path = Path(__file__).parent / 'config.json'
+    global APP_CONFIG
     default_config = {
         'use_mock_hardware': True,
         'display_brightness': 10,
@@ -50,180 +90,230 @@ def load_config():
         'sounds_directory': 'sounds'
     }
 
-    if config_path.exists():
-        with open(config_path) as f:
+    if CONFIG_PATH.exists():
+        with open(CONFIG_PATH) as f:
             config = json.load(f)
-            return {**default_config, **config}
-    return default_config
+            APP_CONFIG = {**default_config, **config}
+    else:
+        APP_CONFIG = default_config
+    return APP_CONFIG
 
 
-# --- Static file routes ---
+def save_config():
+    """Atomically write APP_CONFIG to config.json."""
+    tmp_path = CONFIG_PATH.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(APP_CONFIG, f, indent=4)
+    os.replace(tmp_path, CONFIG_PATH)
 
-@app.route('/')
-def index():
-    return send_from_directory('static', 'index.html')
 
+def settings_response():
+    """Build the settings payload from the in-memory config."""
+    return jsonify({
+        'display_brightness': APP_CONFIG.get('display_brightness', 10),
+        'snooze_duration_minutes': APP_CONFIG.get('snooze_duration_minutes', 9),
+        'alarm_timeout_minutes': APP_CONFIG.get('alarm_timeout_minutes', 5),
+        'volume': APP_CONFIG.get('volume', 80),
+        'default_sound': APP_CONFIG.get('default_sound', 'default.mp3')
+    })
 
-@app.route('/static/<path:filename>')
-def static_files(filename):
-    return send_from_directory('static', filename)
 
+def snooze_alarm():
+    """Snooze the ringing alarm and drop the cached status."""
+    alarm_manager.snooze()
+    cache.delete('status')
 
-# --- REST API routes ---
 
-@app.route('/api/alarms', methods=['GET'])
-def get_alarms():
-    """Get all alarms."""
-    alarms = alarm_manager.get_all_alarms()
-    return jsonify(alarms)
+def dismiss_alarm():
+    """Dismiss the alarm and drop the cached status."""
+    alarm_manager.dismiss()
+    cache.delete('status')
 
 
-@app.route('/api/alarms', methods=['POST'])
-def create_alarm():
-    """Create a new alarm."""
-    data = request.get_json()
+# --- Request schemas ---
 
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
-
-    required_fields = ['time', 'days']
-    for field in required_fields:
-        if field not in data:
-            return jsonify({'error': f'Missing required field: {field}'}), 400
-
-    alarm = alarm_manager.create_alarm(
-        time=data['time'],
-        days=data['days'],
-        sound=data.get('sound', 'default.mp3'),
-        enabled=data.get('enabled', True),
-        label=data.get('label', ''),
-        one_time=data.get('one_time', False)
-    )
+TimeStr = Annotated[str, msgspec.Meta(pattern=r'^([01]\d|2[0-3]):[0-5]\d$')]
+DateStr = Annotated[str, msgspec.Meta(pattern=r'^\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])$')]
 
-    return jsonify(alarm), 201
+class AlarmCreate(msgspec.Struct):
+    time: TimeStr
+    days: Union[list[str], str]
+    sound: str = 'default.mp3'
+    enabled: bool = True
+    label: str = ''
+    one_time: bool = False
 
 
-@app.route('/api/alarms/<alarm_id>', methods=['GET'])
-def get_alarm(alarm_id):
-    """Get a specific alarm."""
-    alarm = alarm_manager.get_alarm(alarm_id)
-    if alarm is None:
-        return jsonify({'error': 'Alarm not found'}), 404
-    return jsonify(alarm)
+class AlarmUpdate(msgspec.Struct):
+    time: Union[TimeStr, msgspec.UnsetType] = msgspec.UNSET
+    days: Union[list[str], str, msgspec.UnsetType] = msgspec.UNSET
+    sound: Union[str, msgspec.UnsetType] = msgspec.UNSET
+    enabled: Union[bool, msgspec.UnsetType] = msgspec.UNSET
+    label: Union[str, msgspec.UnsetType] = msgspec.UNSET
+    one_time: Union[bool, msgspec.UnsetType] = msgspec.UNSET
 
 
-@app.route('/api/alarms/<alarm_id>', methods=['PUT'])
-def update_alarm(alarm_id):
-    """Update an existing alarm."""
-    data = request.get_json()
+class OverrideCreate(msgspec.Struct):
+    alarm_id: str
+    target_date: DateStr
+    override_time: Optional[TimeStr] = None
+    override_sound: Optional[str] = None
+    skip: bool = False
 
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
 
-    alarm = alarm_manager.update_alarm(alarm_id, data)
-    if alarm is None:
-        return jsonify({'error': 'Alarm not found'}), 404
+class OverrideUpdate(msgspec.Struct):
+    override_time: Union[Optional[TimeStr], msgspec.UnsetType] = msgspec.UNSET
+    override_sound: Union[Optional[str], msgspec.UnsetType] = msgspec.UNSET
+    skip: Union[bool, msgspec.UnsetType] = msgspec.UNSET
 
-    return jsonify(alarm)
 
+class SettingsUpdate(msgspec.Struct):
+    display_brightness: Union[int, msgspec.UnsetType] = msgspec.UNSET
+    snooze_duration_minutes: Union[int, msgspec.UnsetType] = msgspec.UNSET
+    alarm_timeout_minutes: Union[int, msgspec.UnsetType] = msgspec.UNSET
+    volume: Union[int, msgspec.UnsetType] = msgspec.UNSET
+    default_sound: Union[str, msgspec.UnsetType] = msgspec.UNSET
 
-@app.route('/api/alarms/<alarm_id>', methods=['DELETE'])
-def delete_alarm(alarm_id):
-    """Delete an alarm."""
-    success = alarm_manager.delete_alarm(alarm_id)
-    if not success:
-        return jsonify({'error': 'Alarm not found'}), 404
-    return jsonify({'message': 'Alarm deleted'}), 200
 
+def decode_body(schema):
+    """Decode and validate the JSON request body against a schema."""
+    data = request.get_data()
+    if not data:
+        raise msgspec.ValidationError('No data provided')
+    # strict=False keeps accepting numbers sent as strings, as int() did
+    return msgspec.json.decode(data, type=schema, strict=False)
 
-@app.route('/api/alarms/<alarm_id>/toggle', methods=['POST'])
-def toggle_alarm(alarm_id):
-    """Toggle an alarm's enabled state."""
-    alarm = alarm_manager.toggle_alarm(alarm_id)
-    if alarm is None:
-        return jsonify({'error': 'Alarm not found'}), 404
-    return jsonify(alarm)
 
+def sent_fields(payload):
+    """Return the fields of a decoded update payload that were present in the request."""
+    return {
+        name: getattr(payload, name)
+        for name in payload.__struct_fields__
+        if getattr(payload, name) is not msgspec.UNSET
+    }
 
-# --- Override endpoints ---
 
-@app.route('/api/overrides', methods=['GET'])
-def get_overrides():
-    """Get all active overrides."""
-    overrides = alarm_manager.get_all_overrides()
-    return jsonify(overrides)
+@app.errorhandler(msgspec.DecodeError)
+def invalid_body(e):
+    """Reject malformed or invalid request bodies."""
+    return jsonify({'error': str(e)}), 400
 
 
-@app.route('/api/overrides', methods=['POST'])
-def create_override():
-    """Create a new override for an alarm instance."""
-    data = request.get_json()
+@functools.lru_cache(maxsize=128)
+def _fmt(moment, fmt):
+    """strftime memoized on (date or second, format); date formats hit all day."""
+    return moment.strftime(fmt)
 
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
-
-    required_fields = ['alarm_id', 'target_date']
-    for field in required_fields:
-        if field not in data:
-            return jsonify({'error': f'Missing required field: {field}'}), 400
-
-    override = alarm_manager.create_override(
-        alarm_id=data['alarm_id'],
-        target_date=data['target_date'],
-        override_time=data.get('override_time'),
-        override_sound=data.get('override_sound'),
-        skip=data.get('skip', False)
-    )
 
-    if override is None:
-        return jsonify({'error': 'Alarm not found or override already exists'}), 400
+@app.before_request
+def require_ready():
+    """Answer API requests with 503 while hardware is initializing, or 500 if it failed."""
+    if not _ready.is_set() and request.path.startswith('/api/') and request.path != '/api/ready':
+        if _init_error:
+            return jsonify({'error': _init_error}), 500
+        return jsonify({'error': 'Initializing'}), 503
 
-    return jsonify(override), 201
 
+# --- Static file routes ---
 
-@app.route('/api/overrides/<override_id>', methods=['GET'])
-def get_override(override_id):
-    """Get a specific override."""
-    override = alarm_manager.get_override(override_id)
-    if override is None:
-        return jsonify({'error': 'Override not found'}), 404
-    return jsonify(override)
+@app.route('/')
+def index():
+    return send_from_directory('static', 'index.html')
 
 
-@app.route('/api/overrides/<override_id>', methods=['PUT'])
-def update_override(override_id):
-    """Update an existing override."""
-    data = request.get_json()
+@app.route('/static/<path:filename>')
+def static_files(filename):
+    return send_from_directory('static', filename)
 
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
 
-    override = alarm_manager.update_override(override_id, data)
-    if override is None:
-        return jsonify({'error': 'Override not found'}), 404
+# --- REST API routes ---
 
-    return jsonify(override)
+def register_crud(name, create_schema, update_schema, create_error='Invalid data'):
+    """Register the list/create/get/update/delete routes for an AlarmManager resource."""
+    plural = f'{name}s'
+    title = name.capitalize()
+
+    # Not cached: the list is a lock-free snapshot read, and the alarm thread
+    # changes it too (auto-dismiss, expired override cleanup)
+    def list_items():
+        return jsonify(getattr(alarm_manager, f'get_all_{plural}')())
+
+    def create_item():
+        data = decode_body(create_schema)
+        item = getattr(alarm_manager, f'create_{name}')(**msgspec.structs.asdict(data))
+        if item is None:
+            return jsonify({'error': create_error}), 400
+        cache.delete('status')
+        return jsonify(item), 201
+
+    def get_item(item_id):
+        item = getattr(alarm_manager, f'get_{name}')(item_id)
+        if item is None:
+            return jsonify({'error': f'{title} not found'}), 404
+        return jsonify(item)
+
+    def update_item(item_id):
+        data = sent_fields(decode_body(update_schema))
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        item = getattr(alarm_manager, f'update_{name}')(item_id, data)
+        if item is None:
+            return jsonify({'error': f'{title} not found'}), 404
+        cache.delete('status')
+        return jsonify(item)
+
+    def delete_item(item_id):
+        if not getattr(alarm_manager, f'delete_{name}')(item_id):
+            return jsonify({'error': f'{title} not found'}), 404
+        cache.delete('status')
+        return jsonify({'message': f'{title} deleted'}), 200
+
+    app.add_url_rule(f'/api/{plural}', f'get_{plural}', list_items, methods=['GET'])
+    app.add_url_rule(f'/api/{plural}', f'create_{name}', create_item, methods=['POST'])
+    app.add_url_rule(f'/api/{plural}/<item_id>', f'get_{name}', get_item, methods=['GET'])
+    app.add_url_rule(f'/api/{plural}/<item_id>', f'update_{name}', update_item, methods=['PUT'])
+    app.add_url_rule(f'/api/{plural}/<item_id>', f'delete_{name}', delete_item, methods=['DELETE'])
+
+
+register_crud('alarm', AlarmCreate, AlarmUpdate)
+
+register_crud(
+    'override', OverrideCreate, OverrideUpdate,
+    create_error='Alarm not found or override already exists'
+)
 
 
-@app.route('/api/overrides/<override_id>', methods=['DELETE'])
-def delete_override(override_id):
-    """Delete an override (restore original)."""
-    success = alarm_manager.delete_override(override_id)
-    if not success:
-        return jsonify({'error': 'Override not found'}), 404
-    return jsonify({'message': 'Override deleted'}), 200
+@app.route('/api/alarms/<alarm_id>/toggle', methods=['POST'])
+def toggle_alarm(alarm_id):
+    """Toggle an alarm's enabled state."""
+    alarm = alarm_manager.toggle_alarm(alarm_id)
+    if alarm is None:
+        return jsonify({'error': 'Alarm not found'}), 404
+    cache.delete('status')
+    return jsonify(alarm)
 
 
 # --- Status and control endpoints ---
 
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Report whether hardware initialization has finished, or why it failed."""
+    if _init_error:
+        return jsonify({'ready': False, 'error': _init_error}), 500
+    is_ready = _ready.is_set()
+    return jsonify({'ready': is_ready}), 200 if is_ready else 503
+
+
 @app.route('/api/status', methods=['GET'])
+@cache.cached(timeout=1, key_prefix='status')
 def get_status():
-    """Get current system status."""
+    """Get current system status (cached for a second since it carries the time)."""
     now = rtc.get_time()
+    today = now.date()
     return jsonify({
-        'time': now.strftime('%H:%M:%S'),
-        'date': now.strftime('%Y-%m-%d'),
-        'day': now.strftime('%A'),
+        'time': _fmt(now.replace(microsecond=0), '%H:%M:%S'),
+        'date': _fmt(today, '%Y-%m-%d'),
+        'day': _fmt(today, '%A'),
         'alarm_ringing': alarm_manager.is_ringing(),
         'alarm_snoozed': alarm_manager.is_snoozed(),
         'next_alarm': alarm_manager.get_next_alarm_info()
@@ -234,7 +324,7 @@ def get_status():
 def snooze():
     """Snooze the currently ringing alarm."""
     if alarm_manager.is_ringing():
-        alarm_manager.snooze()
+        snooze_alarm()
         return jsonify({'message': 'Alarm snoozed'})
     return jsonify({'error': 'No alarm currently ringing'}), 400
 
@@ -243,7 +333,7 @@ def snooze():
 def dismiss():
     """Dismiss the currently ringing or snoozed alarm."""
     if alarm_manager.is_ringing() or alarm_manager.is_snoozed():
-        alarm_manager.dismiss()
+        dismiss_alarm()
         return jsonify({'message': 'Alarm dismissed'})
     return jsonify({'error': 'No alarm currently ringing or snoozed'}), 400
 
@@ -274,74 +364,55 @@ def stop_sound():
 @app.route('/api/settings', methods=['GET'])
 def get_settings():
     """Get current settings."""
-    config_path = Path(__file__).parent / 'config.json'
-    if config_path.exists():
-        with open(config_path) as f:
-            config = json.load(f)
-    else:
-        config = {}
-
-    return jsonify({
-        'display_brightness': config.get('display_brightness', 10),
-        'snooze_duration_minutes': config.get('snooze_duration_minutes', 9),
-        'alarm_timeout_minutes': config.get('alarm_timeout_minutes', 5),
-        'volume': config.get('volume', 80),
-        'default_sound': config.get('default_sound', 'default.mp3')
-    })
+    return settings_response()
 
 
 @app.route('/api/settings', methods=['PUT'])
 def update_settings():
     """Update settings."""
-    data = request.get_json()
-    config_path = Path(__file__).parent / 'config.json'
-
-    # Load existing config
-    if config_path.exists():
-        with open(config_path) as f:
-            config = json.load(f)
-    else:
-        config = {}
-
-    # Update brightness
-    if 'display_brightness' in data:
-        brightness = max(0, min(15, int(data['display_brightness'])))
-        config['display_brightness'] = brightness
-        display.set_brightness(brightness)
-
-    # Update snooze duration
-    if 'snooze_duration_minutes' in data:
-        snooze = max(1, min(30, int(data['snooze_duration_minutes'])))
-        config['snooze_duration_minutes'] = snooze
-        alarm_manager.snooze_minutes = snooze
-
-    # Update alarm timeout
-    if 'alarm_timeout_minutes' in data:
-        timeout = max(1, min(60, int(data['alarm_timeout_minutes'])))
-        config['alarm_timeout_minutes'] = timeout
-        alarm_manager.timeout_minutes = timeout
-
-    # Update volume
-    if 'volume' in data:
-        volume = max(0, min(100, int(data['volume'])))
-        config['volume'] = volume
-        audio_player.set_volume(volume)
-
-    # Update default sound
-    if 'default_sound' in data:
-        config['default_sound'] = data['default_sound']
-
-    # Save config
-    with open(config_path, 'w') as f:
-        json.dump(config, f, indent=4)
-
-    return jsonify({
-        'display_brightness': config.get('display_brightness', 10),
-        'snooze_duration_minutes': config.get('snooze_duration_minutes', 9),
-        'alarm_timeout_minutes': config.get('alarm_timeout_minutes', 5),
-        'volume': config.get('volume', 80),
-        'default_sound': config.get('default_sound', 'default.mp3')
-    })
+    data = sent_fields(decode_body(SettingsUpdate))
+
+    with _config_lock:
+        # Only apply and persist settings whose value actually changes
+        config = APP_CONFIG
+        before = dict(config)
+
+        # Update brightness
+        if 'display_brightness' in data:
+            brightness = max(0, min(15, data['display_brightness']))
+            if config.get('display_brightness') != brightness:
+                config['display_brightness'] = brightness
+                display.set_brightness(brightness)
+
+        # Update snooze duration
+        if 'snooze_duration_minutes' in data:
+            snooze = max(1, min(30, data['snooze_duration_minutes']))
+            if config.get('snooze_duration_minutes') != snooze:
+                config['snooze_duration_minutes'] = snooze
+                alarm_manager.snooze_minutes = snooze
+
+        # Update alarm timeout
+        if 'alarm_timeout_minutes' in data:
+            timeout = max(1, min(60, data['alarm_timeout_minutes']))
+            if config.get('alarm_timeout_minutes') != timeout:
+                config['alarm_timeout_minutes'] = timeout
+                alarm_manager.timeout_minutes = timeout
+
+        # Update volume
+        if 'volume' in data:
+            volume = max(0, min(100, data['volume']))
+            if config.get('volume') != volume:
+                config['volume'] = volume
+                audio_player.set_volume(volume)
+
+        # Update default sound
+        if 'default_sound' in data:
+            config['default_sound'] = data['default_sound']
+
+        if config != before:
+            save_config()
+
+    return settings_response()
 
 
 # --- Initialization and shutdown ---
@@ -366,14 +437,15 @@ def init_hardware(config):
 
     button_handler = ButtonHandler(
         mock=use_mock,
-        on_snooze=alarm_manager.snooze,
-        on_dismiss=alarm_manager.dismiss
+        on_snooze=snooze_alarm,
+        on_dismiss=dismiss_alarm
     )
 
     display.set_brightness(config.get('display_brightness', 10))
     display.set_alarm_manager(alarm_manager)
     audio_player.set_volume(config.get('volume', 80))
 
+    _ready.set()
     logger.info(f"Hardware initialized (mock={use_mock})")
 
 
@@ -385,6 +457,19 @@ def start_background_threads():
     logger.info("Background threads started")
 
 
+def init_in_background(config):
+    """Initialize hardware and start its threads without holding up the server."""
+    global _init_error
+    try:
+        init_hardware(config)
+        start_background_threads()
+    except Exception as e:
+        logger.exception(f"Hardware initialization failed: {e}")
+        # Clear readiness too: init_hardware sets it before the threads start
+        _ready.clear()
+        _init_error = f"Hardware initialization failed: {e}"
+
+
 def shutdown(signum=None, frame=None):
     """Clean shutdown of all components."""
     logger.info("Shutting down...")
@@ -397,6 +482,8 @@ def shutdown(signum=None, frame=None):
         button_handler.stop()
     if audio_player:
         audio_player.stop()
+    if rtc:
+        rtc.stop()
 
     logger.info("Shutdown complete")
     sys.exit(0)
@@ -408,12 +495,21 @@ def main():
     signal.signal(signal.SIGTERM, shutdown)
 
     config = load_config()
-    init_hardware(config)
-    start_background_threads()
+    # Hardware libraries and bus probes are slow to load; open the port first
+    threading.Thread(target=init_in_background, args=(config,), daemon=True).start()
 
     port = int(os.environ.get('PORT', 8080))
-    logger.info(f"Starting Flask server on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+    try:
+        from waitress import serve
+    except ImportError:
+        logger.warning("waitress not installed, falling back to the Flask development server")
+        logger.info(f"Starting Flask server on port {port}")
+        app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+        return
+
+    # Single process since it owns the hardware; a small thread pool serves requests
+    logger.info(f"Starting waitress server on port {port}")
+    serve(app, host='0.0.0.0', port=port, threads=4, connection_limit=64, channel_timeout=30)
 
 
 if __name__ == '__main__':
@@ -1,8 +1,10 @@
 """
 Audio Module - Handles alarm sound playback.
-Uses subprocess to play audio files through USB speakers.
+Decodes sounds in-process and writes PCM to ALSA when miniaudio and pyalsaaudio
+are installed, otherwise uses subprocess to play audio files through USB speakers.
 """
 
+import concurrent.futures
 import logging
 import os
 import shutil
@@ -17,6 +19,21 @@ class AudioPlayer:
     """Audio player for alarm sounds."""
 
     SUPPORTED_FORMATS = ['.mp3', '.wav', '.ogg', '.flac']
+    _SUPPORTED_SET = frozenset(SUPPORTED_FORMATS)
+
+    # Audio players to try, in order of preference
+    PLAYERS = [
+        ['mpg123', '-q'],  # Good for MP3
+        ['aplay'],  # ALSA player for WAV
+        ['paplay'],  # PulseAudio player
+        ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet'],  # FFmpeg
+        ['cvlc', '--play-and-exit', '--no-video'],  # VLC
+    ]
+
+    # In-process playback format; every sound is decoded to this so one PCM fits all
+    PCM_RATE = 44100
+    PCM_CHANNELS = 2
+    PCM_PERIOD_FRAMES = 1024
 
     def __init__(self, sounds_dir='sounds'):
         self.sounds_dir = Path(__file__).parent / sounds_dir
@@ -25,7 +42,16 @@ class AudioPlayer:
         self._loop = False
         self._loop_thread = None
         self._stop_event = threading.Event()
+        # Reaps stopped player processes so stop() does not block its caller
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='audio-stop')
         self._volume = 80  # 0-100
+        self._player_cmd = self._resolve_player()
+        self._miniaudio = None
+        self._pcm = None
+        self._init_pcm()
+        self._mixer = self._init_mixer()
+        # (directory mtime, sorted sound list, names of all files), swapped as one tuple
+        self._sounds_state = (None, [], frozenset())
 
         # Create sounds directory if it doesn't exist
         self.sounds_dir.mkdir(exist_ok=True)
@@ -38,6 +64,15 @@ class AudioPlayer:
     def set_volume(self, volume):
         """Set volume level (0-100)."""
         self._volume = max(0, min(100, volume))
+
+        if self._mixer is not None:
+            try:
+                self._mixer.setvolume(self._volume)
+                logger.info(f"Volume set to {self._volume}%")
+                return
+            except Exception as e:
+                logger.debug(f"Could not set mixer volume, trying amixer: {e}")
+
         # Try to set system volume via amixer (Linux/Raspberry Pi)
         try:
             subprocess.run(
@@ -65,57 +100,114 @@ class AudioPlayer:
             )
             logger.warning("No alarm sounds found. Add audio files to the sounds directory.")
 
-    def get_available_sounds(self):
-        """Get list of available alarm sounds."""
+    def _scan_sounds(self):
+        """Return the cached directory listing, rescanning only when the directory mtime changes."""
+        try:
+            mtime = self.sounds_dir.stat().st_mtime_ns
+        except OSError as e:
+            logger.error(f"Cannot read sounds directory: {e}")
+            return self._sounds_state
+
+        state = self._sounds_state
+        if state[0] == mtime:
+            return state
+
         sounds = []
-        for ext in self.SUPPORTED_FORMATS:
-            for path in self.sounds_dir.glob(f'*{ext}'):
-                sounds.append({
-                    'name': path.name,
-                    'path': str(path)
-                })
+        names = set()
+        with os.scandir(self.sounds_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                names.add(entry.name)
+                if os.path.splitext(entry.name)[1] in self._SUPPORTED_SET:
+                    sounds.append({
+                        'name': entry.name,
+                        'path': entry.path
+                    })
 
         sounds.sort(key=lambda x: x['name'])
-        return sounds
+        state = (mtime, sounds, frozenset(names))
+        self._sounds_state = state
+        return state
+
+    def get_available_sounds(self):
+        """Get list of available alarm sounds."""
+        return self._scan_sounds()[1]
 
     def _find_sound_file(self, sound_name):
         """Find the full path to a sound file."""
+        _, sounds, names = self._scan_sounds()
+
         # Try exact match first
-        sound_path = self.sounds_dir / sound_name
-        if sound_path.exists():
-            return sound_path
+        if sound_name in names:
+            return self.sounds_dir / sound_name
 
         # Try without extension
         for ext in self.SUPPORTED_FORMATS:
-            sound_path = self.sounds_dir / f"{sound_name}{ext}"
-            if sound_path.exists():
-                return sound_path
+            if f"{sound_name}{ext}" in names:
+                return self.sounds_dir / f"{sound_name}{ext}"
 
         # Fall back to first available sound
-        sounds = self.get_available_sounds()
         if sounds:
             return Path(sounds[0]['path'])
 
         return None
 
-    def _get_player_command(self, sound_path):
-        """Get the appropriate command to play audio based on available players."""
-        # Try different audio players in order of preference
-        players = [
-            ['mpg123', '-q'],  # Good for MP3
-            ['aplay'],  # ALSA player for WAV
-            ['paplay'],  # PulseAudio player
-            ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet'],  # FFmpeg
-            ['cvlc', '--play-and-exit', '--no-video'],  # VLC
-        ]
-
-        for player_cmd in players:
+    def _resolve_player(self):
+        """Find the first installed audio player, once at startup."""
+        for player_cmd in self.PLAYERS:
             if shutil.which(player_cmd[0]):
-                return player_cmd + [str(sound_path)]
+                return player_cmd
 
         logger.warning("No audio player found. Install mpg123, aplay, or ffplay.")
         return None
 
+    def _init_mixer(self):
+        """Open the ALSA Master mixer once, if pyalsaaudio is available."""
+        try:
+            import alsaaudio
+            return alsaaudio.Mixer('Master')
+        except ImportError:
+            return None
+        except Exception as e:
+            logger.debug(f"Could not open ALSA mixer, using amixer: {e}")
+            return None
+
+    def _init_pcm(self):
+        """Open an ALSA PCM for in-process playback, if the libraries are available."""
+        try:
+            import alsaaudio
+            import miniaudio
+
+            self._pcm = alsaaudio.PCM(
+                alsaaudio.PCM_PLAYBACK,
+                channels=self.PCM_CHANNELS,
+                rate=self.PCM_RATE,
+                format=alsaaudio.PCM_FORMAT_S16_LE,
+                periodsize=self.PCM_PERIOD_FRAMES
+            )
+            self._miniaudio = miniaudio
+            logger.info("Using in-process ALSA playback")
+        except ImportError as e:
+            logger.info(f"In-process playback not available, using player subprocess: {e}")
+        except Exception as e:
+            logger.error(f"Failed to open ALSA PCM, using player subprocess: {e}")
+
+    def _can_stream(self, sound_path):
+        """Check that miniaudio can decode a sound, reading only its header."""
+        try:
+            self._miniaudio.get_file_info(str(sound_path))
+            return True
+        except Exception as e:
+            logger.error(f"Cannot decode {sound_path.name}, using player subprocess: {e}")
+            return False
+
+    def _get_player_command(self, sound_path):
+        """Get the command to play a sound with the resolved audio player."""
+        if self._player_cmd is None:
+            return None
+        return self._player_cmd + [str(sound_path)]
+
     def play(self, sound_name, loop=False):
         """Play an alarm sound."""
         self.stop()
@@ -125,19 +217,32 @@ class AudioPlayer:
             logger.error(f"Sound not found: {sound_name}")
             return False
 
-        cmd = self._get_player_command(sound_path)
-        if not cmd:
-            logger.error("No audio player available")
-            return False
+        # Decoding happens on the playback thread, a period at a time
+        stream = self._pcm is not None and self._can_stream(sound_path)
+        if not stream:
+            cmd = self._get_player_command(sound_path)
+            if not cmd:
+                logger.error("No audio player available")
+                return False
 
         self._playing = True
         self._loop = loop
-        self._stop_event.clear()
+        # Each playback gets its own event, so a thread from the previous one
+        # that hasn't exited yet still sees its stop request
+        stop_event = self._stop_event = threading.Event()
+        previous = self._loop_thread
 
-        if loop:
+        if stream:
+            self._loop_thread = threading.Thread(
+                target=self._play_pcm,
+                args=(sound_path, loop, stop_event, previous),
+                daemon=True
+            )
+            self._loop_thread.start()
+        elif loop:
             self._loop_thread = threading.Thread(
                 target=self._play_loop,
-                args=(cmd,),
+                args=(cmd, stop_event, previous),
                 daemon=True
             )
             self._loop_thread.start()
@@ -159,27 +264,66 @@ class AudioPlayer:
             logger.error(f"Failed to start audio playback: {e}")
             self._playing = False
 
-    def _play_loop(self, cmd):
+    def _play_loop(self, cmd, stop_event, previous):
         """Play audio in a loop until stopped."""
-        while self._playing and not self._stop_event.is_set():
+        # Let the previous playback thread finish here rather than in stop()
+        if previous:
+            previous.join()
+
+        while not stop_event.is_set():
             try:
-                self._process = subprocess.Popen(
+                process = subprocess.Popen(
                     cmd,
                     stdout=subprocess.DEVNULL,
                     stderr=subprocess.DEVNULL
                 )
+                # A superseded loop must not replace the newer playback's process
+                if stop_event is self._stop_event:
+                    self._process = process
 
                 # Wait for playback to finish or stop signal
-                while self._process.poll() is None:
-                    if self._stop_event.wait(timeout=0.1):
-                        self._process.terminate()
+                while process.poll() is None:
+                    if stop_event.wait(timeout=0.1):
+                        process.terminate()
+                        self._executor.submit(self._reap, process)
                         return
 
             except Exception as e:
                 logger.error(f"Error in playback loop: {e}")
                 break
 
-        self._playing = False
+        if stop_event is self._stop_event:
+            self._playing = False
+
+    def _play_pcm(self, sound_path, loop, stop_event, previous):
+        """Stream-decode a sound to ALSA a period at a time, repeating if looped, until stopped."""
+        # The previous thread may still be writing its last period to the PCM
+        if previous:
+            previous.join()
+
+        try:
+            while not stop_event.is_set():
+                frames = self._miniaudio.stream_file(
+                    str(sound_path),
+                    output_format=self._miniaudio.SampleFormat.SIGNED16,
+                    nchannels=self.PCM_CHANNELS,
+                    sample_rate=self.PCM_RATE,
+                    frames_to_read=self.PCM_PERIOD_FRAMES
+                )
+                try:
+                    for chunk in frames:
+                        if stop_event.is_set():
+                            return
+                        self._pcm.write(chunk)
+                finally:
+                    frames.close()
+                if not loop:
+                    break
+        except Exception as e:
+            logger.error(f"Error in PCM playback: {e}")
+
+        if stop_event is self._stop_event:
+            self._playing = False
 
     def preview(self, sound_name):
         """Preview a sound (play once, not looped)."""
@@ -190,23 +334,25 @@ class AudioPlayer:
         self._playing = False
         self._stop_event.set()
 
-        if self._process:
+        process = self._process
+        self._process = None
+        if process:
             try:
-                self._process.terminate()
-                self._process.wait(timeout=1)
-            except subprocess.TimeoutExpired:
-                self._process.kill()
+                process.terminate()
+                self._executor.submit(self._reap, process)
             except Exception as e:
                 logger.error(f"Error stopping audio: {e}")
-            finally:
-                self._process = None
-
-        if self._loop_thread:
-            self._loop_thread.join(timeout=1)
-            self._loop_thread = None
 
         logger.debug("Audio stopped")
 
+    def _reap(self, process):
+        """Wait for a terminated player to exit, killing it if it hangs."""
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
     def is_playing(self):
         """Check if audio is currently playing."""
         return self._playing
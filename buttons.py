@@ -4,8 +4,6 @@ Supports both real GPIO hardware and mock mode for testing.
 """
 
 import logging
-import threading
-import time
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +15,7 @@ class ButtonHandler:
     DEFAULT_SNOOZE_PIN = 17
     DEFAULT_DISMISS_PIN = 27
 
-    # Debounce time in seconds
+    # Debounce time in seconds (applied by GPIO edge detection)
     DEBOUNCE_TIME = 0.3
 
     def __init__(self, mock=True, snooze_pin=None, dismiss_pin=None,
@@ -30,12 +28,8 @@ class ButtonHandler:
         self.on_dismiss = on_dismiss
 
         self._running = False
-        self._thread = None
         self._gpio = None
 
-        self._last_snooze_time = 0
-        self._last_dismiss_time = 0
-
         if not mock:
             self._init_hardware()
         else:
@@ -52,8 +46,7 @@ class ButtonHandler:
 
             # Set up buttons with internal pull-up resistors
             # Buttons are expected to connect pin to ground when pressed
-            GPIO.setup(self.snooze_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-            GPIO.setup(self.dismiss_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            GPIO.setup([self.snooze_pin, self.dismiss_pin], GPIO.IN, pull_up_down=GPIO.PUD_UP)
 
             # Add event detection with callbacks
             GPIO.add_event_detect(
@@ -80,11 +73,6 @@ class ButtonHandler:
 
     def _snooze_callback(self, channel):
         """Callback for snooze button press."""
-        current_time = time.time()
-        if current_time - self._last_snooze_time < self.DEBOUNCE_TIME:
-            return
-
-        self._last_snooze_time = current_time
         logger.info("Snooze button pressed")
 
         if self.on_snooze:
@@ -95,11 +83,6 @@ class ButtonHandler:
 
     def _dismiss_callback(self, channel):
         """Callback for dismiss button press."""
-        current_time = time.time()
-        if current_time - self._last_dismiss_time < self.DEBOUNCE_TIME:
-            return
-
-        self._last_dismiss_time = current_time
         logger.info("Dismiss button pressed")
 
         if self.on_dismiss:
@@ -108,16 +91,6 @@ class ButtonHandler:
             except Exception as e:
                 logger.error(f"Error in dismiss callback: {e}")
 
-    def _mock_input_loop(self):
-        """Mock input loop for testing without hardware."""
-        logger.info("Mock button handler started (no input in mock mode)")
-
-        while self._running:
-            # In mock mode, buttons can only be triggered via API
-            time.sleep(1)
-
-        logger.info("Mock button handler stopped")
-
     def start(self):
         """Start the button handler."""
         if self._running:
@@ -125,11 +98,10 @@ class ButtonHandler:
 
         self._running = True
 
+        # For real hardware, GPIO event detection is already set up.
+        # In mock mode, buttons can only be triggered via simulate_snooze/simulate_dismiss.
         if self.mock:
-            # Start mock input thread
-            self._thread = threading.Thread(target=self._mock_input_loop, daemon=True)
-            self._thread.start()
-        # For real hardware, GPIO event detection is already set up
+            logger.info("Mock button handler started (no input in mock mode)")
 
         logger.info("Button handler started")
 
@@ -137,9 +109,6 @@ class ButtonHandler:
         """Stop the button handler and clean up GPIO."""
         self._running = False
 
-        if self._thread:
-            self._thread.join(timeout=2)
-
         if self._gpio:
             try:
                 self._gpio.cleanup([self.snooze_pin, self.dismiss_pin])
@@ -5,7 +5,6 @@ Supports both real hardware (HT16K33) and mock mode for testing.
 
 import logging
 import threading
-import time
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -17,12 +16,22 @@ class Display:
     # HT16K33 I2C address (default)
     DEFAULT_ADDRESS = 0x70
 
+    # Display RAM layout for the 4-digit backpack, as offsets into the write buffer
+    # (after the command byte): digits at 1, 3, 7, 9 and the colon at 5
+    _COLON_OFFSET = 5
+    _COLON_BIT = 0x02
+    _DOT_BIT = 0x80
+
+    # 7-segment glyphs for the digits 0-9 (bit 0 = segment a ... bit 6 = segment g)
+    _DIGIT_SEGMENTS = (0x3F, 0x06, 0x5B, 0x4F, 0x66, 0x6D, 0x7D, 0x07, 0x7F, 0x6F)
+
     def __init__(self, mock=True, address=None):
         self.mock = mock
         self.address = address or self.DEFAULT_ADDRESS
 
         self._running = False
         self._thread = None
+        self._stop_event = threading.Event()
         self._brightness = 10
         self._colon = True
         self._alarm_indicator = False
@@ -31,6 +40,9 @@ class Display:
         self._alarm_manager = None
 
         self._device = None
+        self._i2c_device = None
+        # Local mirror of the display RAM: command byte 0x00 followed by 16 data bytes
+        self._buffer = bytearray(17)
         if not mock:
             self._init_hardware()
         else:
@@ -46,6 +58,10 @@ class Display:
             self._device = Seg7x4(i2c, address=self.address)
             self._device.auto_write = False
             self._device.brightness = self._brightness / 15.0
+
+            # Frames are written straight to the controller; newer library versions keep a list of devices
+            i2c_device = self._device.i2c_device
+            self._i2c_device = i2c_device[0] if isinstance(i2c_device, list) else i2c_device
             logger.info(f"HT16K33 display initialized at address 0x{self.address:02X}")
         except ImportError as e:
             logger.warning(f"Hardware libraries not available, falling back to mock: {e}")
@@ -79,10 +95,16 @@ class Display:
     def show_time(self, hours, minutes):
         """Display time on the 7-segment display."""
         if self._device:
-            time_str = f"{hours:02d}{minutes:02d}" + ("." if self._alarm_armed else "")
-            self._device.print(time_str)
-            self._device.colon = self._colon
-            self._device.show()
+            buf = self._buffer
+            glyphs = self._DIGIT_SEGMENTS
+            h1, h2 = divmod(hours, 10)
+            m1, m2 = divmod(minutes, 10)
+            buf[1] = glyphs[h1]
+            buf[3] = glyphs[h2]
+            buf[7] = glyphs[m1]
+            buf[9] = glyphs[m2] | (self._DOT_BIT if self._alarm_armed else 0)
+            buf[self._COLON_OFFSET] = self._COLON_BIT if self._colon else 0
+            self._write_buffer()
         else:
             # Mock mode - log to console
             colon = ':' if self._colon else ' '
@@ -101,15 +123,23 @@ class Display:
     def clear(self):
         """Clear the display."""
         if self._device:
-            self._device.fill(0)
-            self._device.show()
+            self._buffer[1:] = bytes(16)
+            self._write_buffer()
         logger.debug("Display cleared")
 
+    def _write_buffer(self):
+        """Write the whole display RAM mirror in a single I2C transaction."""
+        with self._i2c_device:
+            self._i2c_device.write(self._buffer)
+
     def _update_loop(self):
         """Background thread that updates the display."""
         logger.info("Display update thread started")
 
         blink_counter = 0
+        last_minute = None
+        # What is currently on the display: None when blanked, () before the first draw
+        last_frame = ()
 
         while self._running:
             try:
@@ -118,29 +148,37 @@ class Display:
                     now = self._rtc.get_time()
                 else:
                     now = datetime.now()
+                hour_minute = (now.hour, now.minute)
 
                 # Blink colon every half second
                 blink_counter += 1
                 self._colon = (blink_counter % 2) == 0
 
-                # Check if any alarm is within the next 12 hours
-                if self._alarm_manager:
+                # Check once a minute if any alarm is within the next 12 hours
+                if self._alarm_manager and hour_minute != last_minute:
                     next_alarm = self._alarm_manager.get_next_alarm_info()
                     self._alarm_armed = next_alarm is not None and next_alarm['minutes_until'] <= 720
+                    last_minute = hour_minute
 
                 # If alarm is ringing, blink the display
-                if self._alarm_indicator:
-                    if blink_counter % 4 < 2:
-                        self.show_time(now.hour, now.minute)
-                    else:
-                        self.clear()
+                if self._alarm_indicator and blink_counter % 4 >= 2:
+                    frame = None
                 else:
-                    self.show_time(now.hour, now.minute)
+                    frame = (hour_minute, self._colon, self._alarm_armed)
+
+                # Only write to the display when what it shows has changed
+                if frame != last_frame:
+                    if frame is None:
+                        self.clear()
+                    else:
+                        self.show_time(now.hour, now.minute)
+                    last_frame = frame
 
             except Exception as e:
                 logger.error(f"Error updating display: {e}")
 
-            time.sleep(0.5)
+            if self._stop_event.wait(0.5):
+                break
 
         self.clear()
         logger.info("Display update thread stopped")
@@ -151,12 +189,14 @@ class Display:
             return
 
         self._running = True
+        self._stop_event.clear()
         self._thread = threading.Thread(target=self._update_loop, daemon=True)
         self._thread.start()
 
     def stop(self):
         """Stop the display update thread."""
         self._running = False
+        self._stop_event.set()
         if self._thread:
             self._thread.join(timeout=2)
         self.clear()
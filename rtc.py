@@ -1,50 +1,127 @@
 """
 RTC Module - Real Time Clock interface.
 Supports both real DS3231 hardware and mock mode for testing.
+
+Only the standard library is imported at module level. The CircuitPython
+(board, busio, adafruit_ds3231) and RPi.GPIO imports live inside the
+hardware code paths, so mock mode never loads them.
 """
 
+import asyncio
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
 
+def _to_bcd(value):
+    """Encode a value (0-99) as BCD."""
+    return ((value // 10) << 4) | (value % 10)
+
+
 class RTC:
     """Real Time Clock interface for DS3231."""
 
     DEFAULT_ADDRESS = 0x68
 
-    def __init__(self, mock=True, address=None):
+    # How long (seconds) get_time() extrapolates from the last read before
+    # going back to the chip
+    DEFAULT_CACHE_TTL = 0.25
+
+    # GPIO (BCM) wired to the DS3231 INT/SQW output for hardware alarms
+    DEFAULT_INT_PIN = 22
+
+    # DS3231 registers and bits
+    REG_ALARM1 = 0x07
+    REG_CONTROL = 0x0E
+    REG_STATUS = 0x0F
+    CONTROL_A1IE = 0x01
+    CONTROL_INTCN = 0x04
+    CONTROL_CONV = 0x20
+    STATUS_A1F = 0x01
+    STATUS_BSY = 0x04
+    REG_TEMPERATURE = 0x11
+
+    def __init__(self, mock=True, address=None, cache_ttl=None):
         self.mock = mock
         self.address = address or self.DEFAULT_ADDRESS
+        self._ttl = self.DEFAULT_CACHE_TTL if cache_ttl is None else cache_ttl
+        self._cache = (None, 0.0)
 
         self._device = None
+        self._int_pin = None
         if not mock:
             self._init_hardware()
         else:
             logger.info("RTC running in mock mode (using system time)")
 
-    def _init_hardware(self):
-        """Initialize the real DS3231 hardware."""
+    def _init_hardware(self, attempts=3):
+        """Initialize the real DS3231 hardware, retrying transient I2C errors."""
         try:
             import board
             import busio
             import adafruit_ds3231
-
-            i2c = busio.I2C(board.SCL, board.SDA)
-            self._device = adafruit_ds3231.DS3231(i2c)
-            logger.info(f"DS3231 RTC initialized at address 0x{self.address:02X}")
         except ImportError as e:
             logger.warning(f"Hardware libraries not available, falling back to mock: {e}")
             self.mock = True
-        except Exception as e:
-            logger.error(f"Failed to initialize RTC hardware: {e}")
-            self.mock = True
+            return
+
+        # The bus can still be settling right after boot: an I/O error, or the
+        # driver's probe not finding the chip (ValueError), is retried with
+        # backoff; anything else is a real fault and propagates
+        for attempt in range(attempts):
+            i2c = None
+            try:
+                i2c = busio.I2C(board.SCL, board.SDA)
+                self._device = adafruit_ds3231.DS3231(i2c)
+                logger.info(f"DS3231 RTC initialized at address 0x{self.address:02X}")
+                return
+            except (OSError, ValueError) as e:
+                logger.warning(f"RTC not responding (attempt {attempt + 1}/{attempts}): {e}")
+                if i2c is not None:
+                    i2c.deinit()
+                if attempt + 1 < attempts:
+                    time.sleep(0.1 * 2 ** attempt)
+
+        logger.error("RTC unreachable after retries, falling back to mock")
+        self.mock = True
 
     def get_time(self):
-        """Get the current time from the RTC."""
+        """Get the current time from the RTC, reusing a recent read within the TTL."""
+        now_m = time.monotonic()
+        cached = self._cached_time(now_m)
+        if cached:
+            return cached
+
+        result = self._read_blocking()
+        self._cache = (result, now_m + self._ttl)
+        return result
+
+    async def get_time_async(self):
+        """Get the current time, moving the I2C read off the event loop only when the cache is stale."""
+        now_m = time.monotonic()
+        cached = self._cached_time(now_m)
+        if cached:
+            return cached
+
+        result = await asyncio.to_thread(self._read_blocking)
+        self._cache = (result, now_m + self._ttl)
+        return result
+
+    def _cached_time(self, now_m):
+        """Extrapolate the cached reading to now_m, or None if it has expired."""
+        cached, deadline = self._cache
+        if cached and now_m < deadline:
+            return cached + timedelta(seconds=now_m - (deadline - self._ttl))
+        return None
+
+    def _read_blocking(self):
+        """Read the time from the DS3231 (or the system clock in mock mode)."""
         if self._device:
-            # Real hardware - get time from DS3231
+            # Real hardware - get time from DS3231. The driver reads all seven
+            # time registers in one transaction and returns a struct_time, so
+            # the field accesses below don't touch the bus again.
             try:
                 rtc_time = self._device.datetime
                 return datetime(
@@ -66,28 +143,160 @@ class RTC:
         """Set the RTC time."""
         if self._device:
             try:
-                import time
                 self._device.datetime = time.struct_time((
                     dt.year, dt.month, dt.day,
                     dt.hour, dt.minute, dt.second,
                     dt.weekday(), -1, -1
                 ))
+                self._cache = (None, 0.0)
                 logger.info(f"RTC time set to {dt}")
             except Exception as e:
                 logger.error(f"Error setting RTC: {e}")
         else:
             logger.info(f"Mock RTC: would set time to {dt}")
 
+    async def set_time_async(self, dt):
+        """Set the RTC time without blocking the event loop on the I2C write."""
+        await asyncio.to_thread(self.set_time, dt)
+
     def sync_from_system(self):
         """Sync the RTC from the system clock."""
-        self.set_time(datetime.now())
+        if self._device:
+            try:
+                # localtime() is already the struct_time the driver wants
+                now = time.localtime()
+                self._device.datetime = now
+                self._cache = (None, 0.0)
+                logger.info(f"RTC synced from system clock ({time.strftime('%Y-%m-%d %H:%M:%S', now)})")
+            except Exception as e:
+                logger.error(f"Error setting RTC: {e}")
+        else:
+            logger.info("Mock RTC: would sync from system clock")
+
+    def _read_registers(self, register, length):
+        """Read consecutive DS3231 registers in one I2C transaction."""
+        buf = bytearray(length)
+        with self._device.i2c_device as i2c:
+            i2c.write_then_readinto(bytes([register]), buf)
+        return buf
 
-    def get_temperature(self):
-        """Get the temperature from the DS3231 (it has a built-in sensor)."""
+    def _write_registers(self, register, data):
+        """Write consecutive DS3231 registers in one I2C transaction."""
+        with self._device.i2c_device as i2c:
+            i2c.write(bytes([register, *data]))
+
+    def program_alarm(self, dt, callback, int_pin=None):
+        """Program DS3231 alarm 1 to fire daily at dt's time and call callback from the INT/SQW edge."""
+        if not self._device:
+            logger.info(f"Mock RTC: would program alarm for {dt:%H:%M:%S}")
+            return False
+
+        try:
+            import RPi.GPIO as GPIO
+
+            # A1M1-A1M3 clear, A1M4 set: match hours, minutes and seconds
+            self._write_registers(self.REG_ALARM1, [
+                _to_bcd(dt.second),
+                _to_bcd(dt.minute),
+                _to_bcd(dt.hour),
+                0x80
+            ])
+
+            # Clear a stale alarm flag, then route alarm 1 to the INT pin
+            control, status = self._read_registers(self.REG_CONTROL, 2)
+            self._write_registers(self.REG_STATUS, [status & ~self.STATUS_A1F])
+            self._write_registers(self.REG_CONTROL, [control | self.CONTROL_INTCN | self.CONTROL_A1IE])
+
+            def on_interrupt(channel):
+                try:
+                    status, = self._read_registers(self.REG_STATUS, 1)
+                    self._write_registers(self.REG_STATUS, [status & ~self.STATUS_A1F])
+                except Exception as e:
+                    logger.error(f"Error clearing RTC alarm flag: {e}")
+                callback()
+
+            # INT/SQW is open-drain and pulled low while the alarm flag is set
+            pin = int_pin or self.DEFAULT_INT_PIN
+            GPIO.setmode(GPIO.BCM)
+            GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            if self._int_pin is not None:
+                GPIO.remove_event_detect(self._int_pin)
+            GPIO.add_event_detect(pin, GPIO.FALLING, callback=on_interrupt)
+            self._int_pin = pin
+
+            logger.info(f"RTC alarm programmed for {dt:%H:%M:%S} on GPIO{pin}")
+            return True
+        except Exception as e:
+            logger.error(f"Error programming RTC alarm: {e}")
+            return False
+
+    def cancel_alarm(self):
+        """Disarm DS3231 alarm 1 and stop watching the INT/SQW pin."""
+        if not self._device:
+            return
+
+        try:
+            control, status = self._read_registers(self.REG_CONTROL, 2)
+            self._write_registers(self.REG_CONTROL, [control & ~self.CONTROL_A1IE])
+            self._write_registers(self.REG_STATUS, [status & ~self.STATUS_A1F])
+        except Exception as e:
+            logger.error(f"Error disarming RTC alarm: {e}")
+
+        if self._int_pin is not None:
+            try:
+                import RPi.GPIO as GPIO
+
+                GPIO.remove_event_detect(self._int_pin)
+                GPIO.cleanup(self._int_pin)
+            except Exception as e:
+                logger.error(f"Error releasing RTC interrupt pin: {e}")
+            self._int_pin = None
+
+        logger.info("RTC alarm cancelled")
+
+    def stop(self):
+        """Release the RTC, disarming any programmed alarm."""
+        self.cancel_alarm()
+
+    def get_temperature(self, fresh=False):
+        """Get the temperature from the DS3231's last automatic (64s) conversion, or force one if fresh."""
         if self._device:
             try:
-                return self._device.temperature
+                if fresh:
+                    self._convert_temperature()
+                return self._read_temperature()
             except Exception as e:
                 logger.error(f"Error reading temperature: {e}")
                 return None
         return None
+
+    async def get_temperature_async(self, fresh=False):
+        """Get the temperature without blocking the event loop on the I2C read or conversion."""
+        return await asyncio.to_thread(self.get_temperature, fresh)
+
+    def _read_temperature(self):
+        """Read the temperature registers."""
+        # Signed integer part in 0x11, quarter degrees in the top bits of 0x12
+        msb, lsb = self._read_registers(self.REG_TEMPERATURE, 2)
+        if msb & 0x80:
+            msb -= 256
+        return msb + (lsb >> 6) * 0.25
+
+    def _convert_temperature(self, timeout=0.5):
+        """Force a temperature conversion and wait for it to finish."""
+        # The automatic 64s conversion can't be turned off on the DS3231, so
+        # only start a manual one once any conversion in progress has finished
+        deadline = time.monotonic() + timeout
+        while self._read_registers(self.REG_STATUS, 1)[0] & self.STATUS_BSY:
+            if time.monotonic() > deadline:
+                raise TimeoutError("temperature conversion busy")
+            time.sleep(0.01)
+
+        control, = self._read_registers(self.REG_CONTROL, 1)
+        self._write_registers(self.REG_CONTROL, [control | self.CONTROL_CONV])
+
+        # CONV stays set until the new conversion has been written back
+        while self._read_registers(self.REG_CONTROL, 1)[0] & self.CONTROL_CONV:
+            if time.monotonic() > deadline:
+                raise TimeoutError("temperature conversion timed out")
+            time.sleep(0.01)
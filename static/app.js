@@ -9,17 +9,41 @@ let isPreviewPlaying = false;
 let nextAlarmInfo = null;
 
 // Initialize
-document.addEventListener('DOMContentLoaded', () => {
+document.addEventListener('DOMContentLoaded', async () => {
     initDayButtons();
+    updateClock();
+    setInterval(updateClock, 1000);
+    if (!await waitUntilReady()) {
+        return;
+    }
     loadAlarms();
     loadSounds();
     loadSettings();
-    updateClock();
     checkStatus();
-    setInterval(updateClock, 1000);
     setInterval(checkStatus, 5000);
 });
 
+// Wait for the server to finish initializing hardware; false if it failed
+async function waitUntilReady() {
+    while (true) {
+        try {
+            const response = await fetch(`${API_BASE}/ready`);
+            const status = await response.json();
+            if (status.ready) {
+                return true;
+            }
+            if (status.error) {
+                document.getElementById('recurring-list').innerHTML =
+                    `<div class="loading">${escapeHtml(status.error)}</div>`;
+                return false;
+            }
+        } catch (error) {
+            console.error('Error checking readiness:', error);
+        }
+        await new Promise(resolve => setTimeout(resolve, 500));
+    }
+}
+
 // Clock display
 function updateClock() {
     const now = new Date();
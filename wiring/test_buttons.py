@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 """Test script for snooze and dismiss buttons."""
 
-import RPi.GPIO as GPIO
-import time
+import select
 
+try:
+    from periphery import GPIO
+except ImportError:
+    print("Required libraries not installed. Run:")
+    print("  pip install python-periphery")
+    exit(1)
+
+GPIO_CHIP = "/dev/gpiochip0"
 SNOOZE_PIN = 17
 DISMISS_PIN = 27
+DEBOUNCE_NS = 200_000_000
 
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(SNOOZE_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-GPIO.setup(DISMISS_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+# Character-device lines with kernel edge detection and the internal pull-ups enabled
+snooze = GPIO(GPIO_CHIP, SNOOZE_PIN, "in", edge="falling", bias="pull_up")
+dismiss = GPIO(GPIO_CHIP, DISMISS_PIN, "in", edge="falling", bias="pull_up")
+buttons = {snooze.fd: (snooze, "Snooze"), dismiss.fd: (dismiss, "Dismiss")}
+last_press = {snooze.fd: 0, dismiss.fd: 0}
 
 print("Button test running. Press buttons to test (Ctrl+C to exit)...")
 print(f"  Snooze: GPIO{SNOOZE_PIN}")
@@ -18,14 +28,17 @@ print()
 
 try:
     while True:
-        if not GPIO.input(SNOOZE_PIN):
-            print("Snooze button pressed")
-            time.sleep(0.3)  # Debounce
-        if not GPIO.input(DISMISS_PIN):
-            print("Dismiss button pressed")
-            time.sleep(0.3)  # Debounce
-        time.sleep(0.05)
+        # The process sleeps in select until the kernel queues an edge event
+        ready, _, _ = select.select(list(buttons), [], [])
+        for fd in ready:
+            line, name = buttons[fd]
+            event = line.read_event()
+            # Ignore bounces: edges within the debounce window of the last press
+            if event.timestamp - last_press[fd] >= DEBOUNCE_NS:
+                last_press[fd] = event.timestamp
+                print(f"{name} button pressed")
 except KeyboardInterrupt:
     print("\nExiting...")
 finally:
-    GPIO.cleanup()
+    snooze.close()
+    dismiss.close()
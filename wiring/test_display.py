@@ -2,19 +2,32 @@
 """Test script for the 7-segment display."""
 
 import time
+from datetime import datetime, timedelta
 
 try:
     import board
     import busio
     from adafruit_ht16k33.segments import Seg7x4
+    from smbus2 import SMBus
 except ImportError:
     print("Required libraries not installed. Run:")
-    print("  pip install adafruit-circuitpython-ht16k33")
+    print("  pip install adafruit-circuitpython-ht16k33 smbus2")
     exit(1)
 
+DISPLAY_ADDRESS = 0x70
+HT16K33_BRIGHTNESS = 0xE0  # Dimming command; the low nibble is the level (0-15)
+
+# Zero-padded two-digit strings for hours and minutes
+PADDED = [f"{i:02d}" for i in range(60)]
+
+# Segment patterns for 0-9, laid out as HT16K33 display RAM (digit, digit, colon, digit, digit)
+SEG = [0x3F, 0x06, 0x5B, 0x4F, 0x66, 0x6D, 0x7D, 0x07, 0x7F, 0x6F]
+REPEATED_DIGITS = [[s, 0, s, 0, 0, 0, s, 0, s, 0] for s in SEG]
+
 print("Initializing display...")
 i2c = busio.I2C(board.SCL, board.SDA)
-display = Seg7x4(i2c, address=0x70)
+display = Seg7x4(i2c, address=DISPLAY_ADDRESS)
+bus = SMBus(1)
 
 print("Running display test (Ctrl+C to exit)...")
 print("")
@@ -32,8 +45,8 @@ try:
 
     # Test 3: Count
     print("Test 3: Counting 0-9")
-    for i in range(10):
-        display.print(f"{i}{i}{i}{i}")
+    for buf in REPEATED_DIGITS:
+        bus.write_i2c_block_data(DISPLAY_ADDRESS, 0x00, buf)
         time.sleep(0.3)
 
     # Test 4: Colon blink
@@ -48,18 +61,24 @@ try:
     # Test 5: Brightness
     print("Test 5: Brightness levels")
     display.print("8888")
-    for b in [0.0, 0.25, 0.5, 0.75, 1.0, 0.5]:
-        display.brightness = b
+    # Each level is a single-byte dimming command sent straight to the controller
+    for cmd in [HT16K33_BRIGHTNESS | int(b * 15) for b in [0.0, 0.25, 0.5, 0.75, 1.0, 0.5]]:
+        bus.write_byte(DISPLAY_ADDRESS, cmd)
         time.sleep(0.4)
 
     # Test 6: Current time
     print("Test 6: Showing current time")
-    from datetime import datetime
+    show = display.print
+    # Read the wall clock once and extrapolate with monotonic time; sleep to a
+    # monotonic deadline so the I2C write time doesn't add drift
+    start = datetime.now()
+    start_m = next_tick = time.monotonic()
     for _ in range(10):
-        now = datetime.now()
-        display.print(f"{now.hour:02d}{now.minute:02d}")
+        now = start + timedelta(seconds=time.monotonic() - start_m)
+        show(PADDED[now.hour] + PADDED[now.minute])
         display.colon = now.second % 2 == 0
-        time.sleep(0.5)
+        next_tick += 0.5
+        time.sleep(max(0, next_tick - time.monotonic()))
 
     print("")
     print("Display test complete!")
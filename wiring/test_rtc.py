@@ -5,47 +5,79 @@ import time
 from datetime import datetime
 
 try:
-    import board
-    import busio
-    import adafruit_ds3231
+    from smbus2 import SMBus
 except ImportError:
     print("Required libraries not installed. Run:")
-    print("  pip install adafruit-circuitpython-ds3231")
+    print("  pip install smbus2")
     exit(1)
 
+I2C_BUS = 1
+RTC_ADDRESS = 0x68
+
+
+# BCD register value -> integer, indexed by the raw byte
+BCD = bytes((b >> 4) * 10 + (b & 0x0F) for b in range(256))
+
+
+def to_bcd(value):
+    """Encode a value (0-99) as BCD."""
+    return ((value // 10) << 4) | (value % 10)
+
+
 print("Initializing RTC...")
-i2c = busio.I2C(board.SCL, board.SDA)
-rtc = adafruit_ds3231.DS3231(i2c)
+bus = SMBus(I2C_BUS)
+
+# Read every register (time, alarms, control, status, aging, temperature)
+# in one I2C transaction so all fields come from the same snapshot, and take
+# the system time right after it; the bracketing bounds the measurement error
+t0 = time.perf_counter()
+raw = bus.read_i2c_block_data(RTC_ADDRESS, 0x00, 19)
+system_time = datetime.now()
+epsilon = time.perf_counter() - t0
+second = BCD[raw[0x00] & 0x7F]
+minute = BCD[raw[0x01] & 0x7F]
+hour = BCD[raw[0x02] & 0x3F]  # 24-hour mode
+day = BCD[raw[0x04] & 0x3F]
+month = BCD[raw[0x05] & 0x1F]
+year = 2000 + BCD[raw[0x06]]
+
+# Temperature: signed integer part in 0x11, quarter degrees in the top bits of 0x12
+temp_msb = raw[0x11] - 256 if raw[0x11] & 0x80 else raw[0x11]
+temperature = temp_msb + (raw[0x12] >> 6) * 0.25
 
 print("")
 print("=== RTC Status ===")
-print(f"RTC time:    {rtc.datetime.tm_hour:02d}:{rtc.datetime.tm_min:02d}:{rtc.datetime.tm_sec:02d}")
-print(f"RTC date:    {rtc.datetime.tm_year}-{rtc.datetime.tm_mon:02d}-{rtc.datetime.tm_mday:02d}")
-print(f"Temperature: {rtc.temperature:.1f}°C")
+print(f"RTC time:    {hour:02d}:{minute:02d}:{second:02d}")
+print(f"RTC date:    {year}-{month:02d}-{day:02d}")
+print(f"Temperature: {temperature:.1f}°C")
 print("")
 
-system_time = datetime.now()
 print(f"System time: {system_time.strftime('%H:%M:%S')}")
 print(f"System date: {system_time.strftime('%Y-%m-%d')}")
 print("")
 
-# Check if times match (within 2 seconds)
-rtc_dt = datetime(
-    rtc.datetime.tm_year, rtc.datetime.tm_mon, rtc.datetime.tm_mday,
-    rtc.datetime.tm_hour, rtc.datetime.tm_min, rtc.datetime.tm_sec
-)
+# Check if times match (within 2 seconds, plus the read time)
+rtc_dt = datetime(year, month, day, hour, minute, second)
 diff = abs((system_time - rtc_dt).total_seconds())
+print(f"Difference:  {diff:.3f}s (±{epsilon * 1000:.1f}ms)")
+print("")
 
-if diff <= 2:
+if diff <= 2 + epsilon:
     print("RTC and system time are in sync.")
 else:
     print(f"WARNING: RTC differs from system time by {diff:.0f} seconds")
     print("")
     response = input("Sync RTC to system time? [y/N]: ").strip().lower()
     if response == 'y':
-        rtc.datetime = time.struct_time((
-            system_time.year, system_time.month, system_time.day,
-            system_time.hour, system_time.minute, system_time.second,
-            system_time.weekday(), -1, -1
-        ))
+        bus.write_i2c_block_data(RTC_ADDRESS, 0x00, [
+            to_bcd(system_time.second),
+            to_bcd(system_time.minute),
+            to_bcd(system_time.hour),
+            system_time.weekday() + 1,
+            to_bcd(system_time.day),
+            to_bcd(system_time.month),
+            to_bcd(system_time.year % 100)
+        ])
+        # Make sure the oscillator runs on battery and clear the oscillator-stopped flag
+        bus.write_i2c_block_data(RTC_ADDRESS, 0x0E, [raw[0x0E] & 0x7F, raw[0x0F] & 0x7F])
         print("RTC synced to system time.")